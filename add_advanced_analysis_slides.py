@@ -5,6 +5,8 @@ from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 import os
 
+from chart_outputs import chart_asset
+
 # Load existing presentation
 prs = Presentation('FY2024_Campaign_Analysis_Presentation.pptx')
 
@@ -53,7 +55,7 @@ p.font.size = Pt(14)
 p.font.italic = True
 
 if os.path.exists('charts/07_predictive_forecast.png'):
-    slide.shapes.add_picture('charts/07_predictive_forecast.png', Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
+    slide.shapes.add_picture(chart_asset('charts/07_predictive_forecast.png', 'deck'), Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
 
 # ============================================================================
 # OPTIMAL BUDGET ALLOCATION SLIDE
@@ -101,7 +103,7 @@ p.level = 1
 p.font.size = Pt(12)
 
 if os.path.exists('charts/08_optimal_budget_allocation.png'):
-    slide.shapes.add_picture('charts/08_optimal_budget_allocation.png', Inches(0.5), Inches(4.5), Inches(9), Inches(2.5))
+    slide.shapes.add_picture(chart_asset('charts/08_optimal_budget_allocation.png', 'deck'), Inches(0.5), Inches(4.5), Inches(9), Inches(2.5))
 
 # ============================================================================
 # WHAT-IF SCENARIOS SLIDE
@@ -147,7 +149,7 @@ p.font.size = Pt(14)
 p.font.italic = True
 
 if os.path.exists('charts/09_what_if_scenarios.png'):
-    slide.shapes.add_picture('charts/09_what_if_scenarios.png', Inches(0.5), Inches(4), Inches(9), Inches(3))
+    slide.shapes.add_picture(chart_asset('charts/09_what_if_scenarios.png', 'deck'), Inches(0.5), Inches(4), Inches(9), Inches(3))
 
 # ============================================================================
 # ROI OPTIMIZATION SLIDE
@@ -187,7 +189,7 @@ p.font.size = Pt(14)
 p.font.italic = True
 
 if os.path.exists('charts/10_roi_optimization.png'):
-    slide.shapes.add_picture('charts/10_roi_optimization.png', Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
+    slide.shapes.add_picture(chart_asset('charts/10_roi_optimization.png', 'deck'), Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
 
 # ============================================================================
 # UPDATED STRATEGIC RECOMMENDATIONS SLIDE
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -6,14 +5,16 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from campaign_cleaning import schema_memory_report
+from campaign_ingest import load_sheets
+
 # Set style
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (14, 8)
 
 # Read the Excel file
 print("Loading data...")
-df_key = pd.read_excel('Mediately Data Scientist.xlsx', sheet_name='Campaign Name Key')
-df_raw = pd.read_excel('Mediately Data Scientist.xlsx', sheet_name='RAW DATA')
+df_key, df_raw = load_sheets()
 
 print(f"\nCampaign Name Key shape: {df_key.shape}")
 print(f"RAW DATA shape: {df_raw.shape}")
@@ -45,3 +46,6 @@ print("\n=== Date Range ===")
 print(f"Start: {df_raw['Reporting starts'].min()}")
 print(f"End: {df_raw['Reporting ends'].max()}")
 
+# Memory footprint of the cleaned frame under the compact schema
+print("\n=== Cleaned Frame Bytes per Row ===")
+print(schema_memory_report(df_raw).to_string())
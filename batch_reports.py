@@ -0,0 +1,237 @@
+"""Batch mode: run the report pipeline for every client workbook in a directory.
+
+Each workbook is one tenant, named after the file without its extension;
+workbooks whose names differ only in the extension (``a.xlsx`` and
+``a.xlsm``) would share a tree, so they are reported as failed instead. A
+tenant's outputs and caches live in its own tree:
+
+    <out>/<tenant>/analysis_results/   report CSVs (as written by full_analysis.py)
+    <out>/<tenant>/charts/             charts 01-06, with ``--charts`` (other
+                                       ``--profiles`` in charts/<profile>/)
+    <out>/<tenant>/.cache/             Parquet cache of the tenant's workbook
+    <out>/<tenant>/manifest.json       workbook digest, row counts and chart profiles
+                                       of the last run
+
+Tenants run in a process pool with at most ``--jobs`` at a time. A tenant
+whose workbook digest matches its manifest, and whose charts were already
+written in every requested profile when ``--charts`` is given, is skipped
+unless ``--force`` is given. Between runs a changed workbook is re-parsed once and then served from
+its tenant cache. A failing tenant is reported and does not stop the batch.
+With ``--charts``, the chart jobs of every processed tenant are rendered
+together in one process pool once the tables are built, so the charts of
+all tenants spread over all cores. Charts whose inputs did not change are
+copied from the shared chart cache under ``<out>/.cache/charts/``.
+
+The run ends with a throughput summary (rows, seconds and rows/sec per
+tenant and overall), also saved as ``<out>/batch_summary.csv``.
+
+Usage:
+    python batch_reports.py clients/ --out tenants/ --jobs 4 --charts
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from campaign_aggregates import build_cube
+from campaign_cleaning import CAMPAIGN_MAPPING, REPORT_COLUMNS, iter_campaign_batches
+from campaign_dedup import Deduplicator
+from campaign_ingest import CACHE_DIR, KEY_SHEET, file_digest, load_sheet, raw_row_count
+from campaign_resolver import CampaignResolver
+from campaign_validation import Validator
+from report_charts import (CHART_CACHE_DIR, CHARTS_DIR, DEFAULT_PROFILE, OUTPUT_PROFILES, descriptive_chart_jobs,
+                           profile_path, render_charts)
+from report_tables import RESULTS_DIR, build_report_tables, categorization_thresholds, save_report_tables
+
+TENANTS_DIR = 'tenants'
+MANIFEST_FILE = 'manifest.json'
+SUMMARY_FILE = 'batch_summary.csv'
+WORKBOOK_PATTERNS = ('*.xlsx', '*.xlsm')
+
+
+def find_workbooks(input_dir):
+    """Client workbooks in ``input_dir``, skipping Excel lock files (``~$...``)."""
+    paths = set()
+    for pattern in WORKBOOK_PATTERNS:
+        paths.update(glob.glob(os.path.join(input_dir, pattern)))
+    return sorted(path for path in paths if not os.path.basename(path).startswith('~$'))
+
+
+def tenant_name(path):
+    return os.path.splitext(os.path.basename(path))[0].strip()
+
+
+def _read_manifest(tenant_dir):
+    path = os.path.join(tenant_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def _write_manifest(tenant_dir, manifest):
+    path = os.path.join(tenant_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w') as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def _record_chart_profiles(tenant_dir, profiles):
+    # Called once a tenant's charts are written, so the manifest never lists
+    # a profile whose charts are missing
+    manifest = _read_manifest(tenant_dir)
+    manifest['chart_profiles'] = sorted(set(manifest.get('chart_profiles', [])) | set(profiles))
+    _write_manifest(tenant_dir, manifest)
+
+
+def _tenant_resolver(path, cache_dir):
+    try:
+        return CampaignResolver.from_key_sheet(load_sheet(KEY_SHEET, path, cache_dir))
+    except ValueError:
+        # No 'Campaign Name Key' sheet: naming convention and built-in names only
+        return CampaignResolver(CAMPAIGN_MAPPING)
+
+
+def run_tenant(path, out_dir=TENANTS_DIR, force=False, charts=False, profiles=(DEFAULT_PROFILE,)):
+    """Build and save one tenant's report tables; returns a summary row.
+
+    With ``charts`` the row's 'Chart_Jobs' lists the tenant's chart jobs,
+    left for the caller to render in ``profiles``. An unchanged tenant is
+    only skipped if its charts are already written in all of ``profiles``.
+    """
+    start = time.time()
+    tenant = tenant_name(path)
+    tenant_dir = os.path.join(out_dir, tenant)
+    results_dir = os.path.join(tenant_dir, RESULTS_DIR)
+    cache_dir = os.path.join(tenant_dir, CACHE_DIR)
+    summary = {'Tenant': tenant, 'Workbook': path}
+    try:
+        digest = file_digest(path)
+        manifest = _read_manifest(tenant_dir)
+        unchanged = manifest.get('digest') == digest
+        charts_done = not charts or set(profiles) <= set(manifest.get('chart_profiles', []))
+        if not force and unchanged and charts_done and os.path.isdir(results_dir):
+            summary.update(Status='unchanged', Rows=manifest['rows'], Lead_Rows=manifest['lead_rows'])
+        else:
+            resolver = _tenant_resolver(path, cache_dir)
+            deduplicator = Deduplicator()
+            validator = Validator()
+            cube = build_cube(iter_campaign_batches(path, campaign_mapping=resolver, columns=REPORT_COLUMNS,
+                                                    objective='Leads', cache_dir=cache_dir,
+                                                    dedupe=deduplicator, validate=validator))
+            tables = build_report_tables(cube)
+            save_report_tables(tables, results_dir)
+            if charts:
+                summary['Chart_Jobs'] = descriptive_chart_jobs(
+                    tables, categorization_thresholds(tables['program_performance']),
+                    os.path.join(tenant_dir, CHARTS_DIR))
+            rows = int(raw_row_count(path, cache_dir))
+            lead_rows = int(cube['Rows'].sum())
+            _write_manifest(tenant_dir, {
+                'workbook': os.path.abspath(path),
+                'digest': digest,
+                'rows': rows,
+                'lead_rows': lead_rows,
+                'unmatched_campaigns': dict(resolver.unmatched),
+                'duplicate_rows_dropped': dict(deduplicator.dropped),
+                'data_quality_violations': dict(validator.violations),
+                'data_quality_violations_outside_filter': dict(validator.audit_violations),
+                # Charts of an unchanged workbook written by an earlier run are still current
+                'chart_profiles': manifest.get('chart_profiles', []) if unchanged else [],
+                'finished_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+            })
+            summary.update(Status='processed', Rows=rows, Lead_Rows=lead_rows)
+    except Exception as exc:
+        summary.update(Status=f'failed: {type(exc).__name__}: {exc}', Rows=0, Lead_Rows=0)
+    summary['Seconds'] = time.time() - start
+    return summary
+
+
+def run_batch(input_dir, out_dir=TENANTS_DIR, jobs=None, force=False, charts=False, profiles=(DEFAULT_PROFILE,)):
+    """Process every workbook in ``input_dir``; returns the summary table.
+
+    With ``charts`` each tenant's charts are written in every output profile
+    of ``profiles``.
+    """
+    by_tenant = {}
+    for path in find_workbooks(input_dir):
+        by_tenant.setdefault(tenant_name(path), []).append(path)
+    paths = [tenant_paths[0] for tenant_paths in by_tenant.values() if len(tenant_paths) == 1]
+    # Two workbooks for one tenant would overwrite each other's tree and manifest
+    rows = [{'Tenant': tenant, 'Workbook': ', '.join(tenant_paths), 'Rows': 0, 'Lead_Rows': 0, 'Seconds': 0.0,
+             'Status': f"failed: tenant name shared by {', '.join(map(os.path.basename, tenant_paths))}"}
+            for tenant, tenant_paths in by_tenant.items() if len(tenant_paths) > 1]
+
+    workers = jobs or os.cpu_count() or 1
+    jobs = max(1, min(workers, len(paths) or 1))
+    if jobs == 1:
+        rows += [run_tenant(path, out_dir, force, charts, profiles) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(run_tenant, path, out_dir, force, charts, profiles) for path in paths]
+            rows += [future.result() for future in as_completed(futures)]
+
+    chart_jobs = {row['Tenant']: row.pop('Chart_Jobs', []) for row in rows}
+    rendered = pd.Series(dtype=bool)
+    if charts:
+        results = render_charts([job for tenant_jobs in chart_jobs.values() for job in tenant_jobs], workers,
+                                cache_dir=os.path.join(out_dir, CHART_CACHE_DIR), profiles=profiles)
+        rendered = results.set_index('Path')['Status'] == 'rendered'
+        for tenant, tenant_jobs in chart_jobs.items():
+            if tenant_jobs:
+                _record_chart_profiles(os.path.join(out_dir, tenant), profiles)
+    for row in rows:
+        paths = [profile_path(path, profile) for _, path, _ in chart_jobs[row['Tenant']] for profile in profiles]
+        row['Charts'] = len(paths)
+        row['Charts_Rendered'] = int(rendered.reindex(paths).sum())
+
+    summary = pd.DataFrame(rows, columns=['Tenant', 'Status', 'Rows', 'Lead_Rows', 'Charts', 'Charts_Rendered',
+                                          'Seconds', 'Workbook'])
+    processed = (summary['Status'] == 'processed') & (summary['Seconds'] > 0)
+    summary['Rows_per_Second'] = (summary['Rows'] / summary['Seconds']).where(processed)
+    return summary.sort_values('Tenant').reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('input_dir', help='Directory of client workbooks, one per tenant')
+    parser.add_argument('--out', default=TENANTS_DIR, help='Root of the per-tenant output trees')
+    parser.add_argument('--jobs', type=int, default=None, help='Tenants processed at once (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Rebuild tenants whose workbook is unchanged')
+    parser.add_argument('--charts', action='store_true', help='Also render charts 01-06 for processed tenants')
+    parser.add_argument('--profiles', nargs='+', choices=list(OUTPUT_PROFILES), default=[DEFAULT_PROFILE],
+                        help='Output profiles the charts are written in')
+    args = parser.parse_args()
+
+    start = time.time()
+    summary = run_batch(args.input_dir, args.out, args.jobs, args.force, args.charts, args.profiles)
+    wall = time.time() - start
+    if summary.empty:
+        print(f"No workbooks found in {args.input_dir}")
+        return
+
+    os.makedirs(args.out, exist_ok=True)
+    summary.to_csv(os.path.join(args.out, SUMMARY_FILE), index=False)
+    print(summary[['Tenant', 'Status', 'Rows', 'Lead_Rows', 'Charts', 'Charts_Rendered', 'Seconds',
+                   'Rows_per_Second']]
+          .round(2).to_string(index=False))
+
+    processed = summary[summary['Status'] == 'processed']
+    failed = summary['Status'].str.startswith('failed').sum()
+    print(f"\n{len(summary)} tenants in {wall:.2f}s: {len(processed)} processed, "
+          f"{(summary['Status'] == 'unchanged').sum()} unchanged, {failed} failed")
+    if summary['Charts'].sum():
+        print(f"Charts: {summary['Charts'].sum()} total, "
+              f"{summary['Charts'].sum() - summary['Charts_Rendered'].sum()} reused from the chart cache, "
+              f"{summary['Charts_Rendered'].sum()} rendered")
+    if len(processed):
+        print(f"Throughput: {processed['Rows'].sum() / wall:,.0f} rows/sec overall, "
+              f"{processed['Seconds'].mean():.2f}s per processed tenant")
+
+
+if __name__ == '__main__':
+    main()
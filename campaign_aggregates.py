@@ -0,0 +1,176 @@
+"""Single-pass aggregation cube for the campaign reports.
+
+The cleaned rows are scanned once and reduced to an additive cube at the
+finest grain any report needs, Program x Date. Each batch is reduced to a
+partial cube (sums, plus sum and count for columns reported as means) and
+partials combine by addition, so the cube can be built from a stream without
+the full frame ever being in memory.
+
+Every report table (monthly, weekly, per program) is then a roll-up of the
+cube. Calendar attributes (Month, Month_Name, Week, ...) are attached to the
+cube rows by date, so roll-ups by them never touch the raw rows again.
+Weekly and monthly roll-ups are keyed on the integer Year_Week and
+Fiscal_Period so that multi-year data does not merge week 1 (or July) of
+different years.
+
+The cube stores only additive values. Ratio metrics (CPL, conversion rates,
+CTR) are computed from the rolled-up sums at query time, so cubes built from
+different partitions or increments merge by plain addition.
+"""
+import os
+
+import pandas as pd
+
+from campaign_calendar import date_features
+
+CUBE_GRAIN = ['Program', 'Date']
+CUBE_SUM_COLUMNS = ['Amount spent (USD)', 'Results', 'Link clicks', 'Landing page views', 'Impressions']
+CUBE_MEAN_COLUMNS = ['CPL']
+CUBE_DATE_ATTRIBUTES = ('Month', 'Month_Name', 'Quarter', 'Week', 'Year', 'Year_Week', 'Fiscal_Period')
+
+# CPL options. Spend-weighted CPL is total spend / total leads. The mean of
+# daily CPL averages the per-row CPL of rows with leads, which is what the
+# reports have always shown.
+CPL_SPEND_WEIGHTED = 'spend_weighted'
+CPL_MEAN_DAILY = 'mean_daily'
+
+# Ratio metrics computed from summed columns: numerator, denominator, scale
+RATIO_METRICS = {
+    'CPL': ('Amount spent (USD)', 'Results', 1),
+    'Click_to_Submit_Rate': ('Results', 'Link clicks', 100),
+    'LPV_to_Submit_Rate': ('Results', 'Landing page views', 100),
+    'CTR': ('Link clicks', 'Impressions', 100),
+    'Leads_per_Dollar': ('Results', 'Amount spent (USD)', 1),
+}
+
+
+def partial_aggregate(batch, by, sum_columns, mean_columns=()):
+    """Reduce one batch to additive partials grouped by ``by``.
+
+    Mean columns are carried as ``<col>_sum`` and ``<col>_count`` (non-null
+    values only) so the mean can be recovered after partials are combined.
+    The number of source rows is kept as ``Rows``.
+    """
+    grouped = batch.groupby(by, observed=True, sort=False)
+    partial = grouped[list(sum_columns)].sum()
+    for col in mean_columns:
+        partial[f'{col}_sum'] = grouped[col].sum()
+        partial[f'{col}_count'] = grouped[col].count()
+    partial['Rows'] = grouped.size()
+    return partial
+
+
+def combine_partials(partials):
+    """Sum partial aggregates that share the same group keys."""
+    combined = pd.concat(partials)
+    return combined.groupby(level=list(range(combined.index.nlevels)), observed=True).sum()
+
+
+def build_cube(batches, sum_columns=CUBE_SUM_COLUMNS, mean_columns=CUBE_MEAN_COLUMNS):
+    """Scan cleaned batches once and return the Program x Date cube.
+
+    The result has one row per program and day with the summed metrics,
+    ``<col>_sum``/``<col>_count`` for mean columns, ``Rows`` and the calendar
+    attributes of the day.
+    """
+    partials = []
+    for batch in batches:
+        partials.append(partial_aggregate(batch, CUBE_GRAIN, sum_columns, mean_columns))
+    if not partials:
+        columns = CUBE_GRAIN + list(sum_columns) + [f'{col}_{part}' for col in mean_columns
+                                                   for part in ('sum', 'count')] + ['Rows']
+        cube = pd.DataFrame(columns=columns)
+        cube['Date'] = pd.to_datetime(cube['Date'])
+    else:
+        cube = combine_partials(partials).reset_index()
+    return _attach_date_attributes(cube)
+
+
+def _attach_date_attributes(cube):
+    cube['Program'] = cube['Program'].astype('category')
+    attributes = date_features(cube['Date'], columns=CUBE_DATE_ATTRIBUTES)
+    for col in attributes.columns:
+        cube[col] = attributes[col]
+    return cube
+
+
+def _additive_columns(cube):
+    return [col for col in cube.columns if col not in CUBE_GRAIN and col not in CUBE_DATE_ATTRIBUTES]
+
+
+def merge_cubes(cubes):
+    """Merge cubes built from separate partitions or increments by addition."""
+    cubes = [cube for cube in cubes if len(cube)]
+    if not cubes:
+        return build_cube([])
+    additive = _additive_columns(cubes[0])
+    stacked = pd.concat([cube[CUBE_GRAIN + additive] for cube in cubes], ignore_index=True)
+    stacked['Program'] = stacked['Program'].astype(str)
+    merged = stacked.groupby(CUBE_GRAIN, sort=True).sum().reset_index()
+    return _attach_date_attributes(merged)
+
+
+def save_cube(cube, path):
+    """Persist the additive part of a cube; calendar attributes are re-derived on load."""
+    stored = cube[CUBE_GRAIN + _additive_columns(cube)].copy()
+    stored['Program'] = stored['Program'].astype(str)
+    tmp_path = f"{path}.tmp"
+    stored.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def load_cube(path):
+    """Load a cube written by :func:`save_cube`."""
+    return _attach_date_attributes(pd.read_parquet(path))
+
+
+def _ratio_inputs(name, cpl):
+    if name == 'CPL' and cpl == CPL_MEAN_DAILY:
+        return 'CPL_sum', 'CPL_count', 1
+    if name == 'CPL' and cpl != CPL_SPEND_WEIGHTED:
+        raise ValueError(f"Unknown CPL method {cpl!r}")
+    return RATIO_METRICS[name]
+
+
+def ratio_metric(sums, name, cpl=CPL_MEAN_DAILY):
+    """Compute ratio metric ``name`` from a table of summed columns.
+
+    Ratios with a zero denominator are NaN. For CPL, ``cpl`` selects
+    ``CPL_MEAN_DAILY`` (needs ``CPL_sum``/``CPL_count``) or
+    ``CPL_SPEND_WEIGHTED``.
+    """
+    numerator, denominator, scale = _ratio_inputs(name, cpl)
+    return sums[numerator] / sums[denominator].where(sums[denominator] > 0) * scale
+
+
+def rollup(cube, by, aggs, cpl=CPL_MEAN_DAILY):
+    """Roll the cube up to ``by``.
+
+    ``by`` names cube columns or index levels. ``aggs`` maps output columns to
+    ``'sum'``, ``'mean'`` (from ``<col>_sum``/``<col>_count``) or ``'ratio'``
+    (a ``RATIO_METRICS`` entry computed from the rolled-up sums, with ``cpl``
+    choosing the CPL method). The result has the same layout as
+    ``df.groupby(by).agg(...).reset_index()`` on the raw rows.
+    """
+    needed = []
+    for col, how in aggs.items():
+        if how == 'sum':
+            needed.append(col)
+        elif how == 'mean':
+            needed += [f'{col}_sum', f'{col}_count']
+        elif how == 'ratio':
+            needed += list(_ratio_inputs(col, cpl)[:2])
+        else:
+            raise ValueError(f"Unsupported aggregation {how!r} for column {col!r}")
+
+    # One grouped pass over the additive columns; everything else derives from it
+    sums = cube.groupby(by, observed=True)[list(dict.fromkeys(needed))].sum()
+    table = pd.DataFrame(index=sums.index)
+    for col, how in aggs.items():
+        if how == 'sum':
+            table[col] = sums[col]
+        elif how == 'mean':
+            table[col] = sums[f'{col}_sum'] / sums[f'{col}_count'].where(sums[f'{col}_count'] > 0)
+        else:
+            table[col] = ratio_metric(sums, col, cpl=cpl)
+    return table.reset_index()
@@ -0,0 +1,98 @@
+"""Calendar dimension for deriving date features by lookup.
+
+Instead of calling ``strftime``/``isocalendar`` on every row, each date is
+turned into an integer day offset and the features are gathered from a
+precomputed one-row-per-day table. The table covers whole calendar years and
+is built once per span, so multi-year data costs one small table plus a few
+array lookups per column.
+
+The fiscal year runs July to June and is named after the calendar year it
+starts in (July 2024 - June 2025 is FY2024).
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+FISCAL_YEAR_START_MONTH = 7
+FISCAL_MONTH_ORDER = ['Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun']
+MONTH_NAME_DTYPE = pd.CategoricalDtype(FISCAL_MONTH_ORDER, ordered=True)
+
+# Default span of the calendar; dates outside it widen the table by whole years
+CALENDAR_FIRST_YEAR = 2015
+CALENDAR_LAST_YEAR = 2035
+
+
+@lru_cache(maxsize=8)
+def build_calendar(first_year=CALENDAR_FIRST_YEAR, last_year=CALENDAR_LAST_YEAR):
+    """One row per day from Jan 1 of ``first_year`` to Dec 31 of ``last_year``.
+
+    Columns: Date, Year, Month, Quarter, Week (ISO week), ISO_Year, Year_Week
+    (ISO year * 100 + ISO week), Fiscal_Year, Fiscal_Month (Jul = 1),
+    Fiscal_Period (fiscal year * 100 + fiscal month) and Month_Name
+    (categorical in fiscal month order).
+
+    Year_Week and Fiscal_Period are the time keys for weekly and monthly
+    roll-ups: unlike Week or Month_Name they stay distinct across years, and
+    they sort chronologically as plain integers.
+    """
+    dates = pd.date_range(f'{first_year}-01-01', f'{last_year}-12-31', freq='D')
+    iso = dates.isocalendar()
+    month = dates.month.to_numpy()
+    fiscal_month = (month - FISCAL_YEAR_START_MONTH) % 12 + 1
+    calendar = pd.DataFrame({
+        'Date': dates,
+        'Year': dates.year.to_numpy().astype('int16'),
+        'Month': month.astype('int8'),
+        'Quarter': dates.quarter.to_numpy().astype('int8'),
+        'Week': iso['week'].to_numpy().astype('int8'),
+        'ISO_Year': iso['year'].to_numpy().astype('int16'),
+        'Fiscal_Year': (dates.year.to_numpy() - (month < FISCAL_YEAR_START_MONTH)).astype('int16'),
+        'Fiscal_Month': fiscal_month.astype('int8'),
+    })
+    calendar['Year_Week'] = (calendar['ISO_Year'].astype('int32') * 100 + calendar['Week']).astype('int32')
+    calendar['Fiscal_Period'] = (calendar['Fiscal_Year'].astype('int32') * 100
+                                 + calendar['Fiscal_Month']).astype('int32')
+    calendar['Month_Name'] = pd.Categorical.from_codes(fiscal_month - 1, dtype=MONTH_NAME_DTYPE)
+    return calendar
+
+
+def _day_numbers(dates):
+    return dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def date_features(dates, columns=('Month', 'Month_Name', 'Quarter', 'Week', 'Year',
+                                  'Year_Week', 'Fiscal_Period')):
+    """Look up calendar ``columns`` for a datetime Series.
+
+    Returns a DataFrame aligned with ``dates``. Missing dates get NaN (or a
+    missing category) in every column.
+    """
+    dates = pd.to_datetime(dates)
+    valid = dates.notna().to_numpy()
+    days = np.zeros(len(dates), dtype=np.int64)
+    days[valid] = _day_numbers(dates[valid])
+
+    first_year, last_year = CALENDAR_FIRST_YEAR, CALENDAR_LAST_YEAR
+    if valid.any():
+        span = np.array([days[valid].min(), days[valid].max()], dtype='datetime64[D]')
+        span_years = span.astype('datetime64[Y]').astype(np.int64) + 1970
+        first_year = min(first_year, int(span_years[0]))
+        last_year = max(last_year, int(span_years[1]))
+    calendar = build_calendar(first_year, last_year)
+
+    offsets = days - _day_numbers(calendar['Date'].iloc[:1])[0]
+    offsets[~valid] = 0
+    features = {}
+    for col in columns:
+        values = calendar[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()[offsets]
+            codes[~valid] = -1
+            features[col] = pd.Categorical.from_codes(codes, dtype=values.dtype)
+        else:
+            picked = values.to_numpy()[offsets]
+            if not valid.all():
+                picked = np.where(valid, picked.astype('float64'), np.nan)
+            features[col] = picked
+    return pd.DataFrame(features, index=dates.index)
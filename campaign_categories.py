@@ -0,0 +1,140 @@
+"""Rule-table categorization of performance rows at any grain.
+
+A category is assigned by the first rule whose clauses all hold, mirroring
+an ``if/elif`` chain, with ``DEFAULT_CATEGORY`` when none match. Rules are
+data (``CATEGORY_RULES``), so they can be changed or extended without
+touching code. Each clause compares a column against a constant or against
+a named threshold from ``THRESHOLD_QUANTILES``.
+
+Thresholds are quantiles of the rows being classified, computed in one
+grouped pass. With ``within`` they are taken per group, e.g. campaigns
+compared against the other campaigns of their program, and each row is
+tested against its own group's thresholds.
+
+Every rule becomes a boolean mask over all rows, and ``np.select`` picks the
+first matching rule, so classifying tens of thousands of ad sets costs a few
+array operations per rule.
+"""
+import operator
+
+import numpy as np
+import pandas as pd
+
+from campaign_aggregates import CUBE_MEAN_COLUMNS, CUBE_SUM_COLUMNS, partial_aggregate, rollup
+
+# Threshold name -> (column, quantile)
+THRESHOLD_QUANTILES = {
+    'cpl_median': ('CPL', 0.5),
+    'cpl_75th': ('CPL', 0.75),
+    'conversion_median': ('Click_to_Submit_Rate', 0.5),
+    'conversion_25th': ('Click_to_Submit_Rate', 0.25),
+}
+
+# (category, clauses) in priority order. A rule matches when all of its
+# clauses hold; list a category twice to match either set of clauses. A
+# clause is (column, operator, value) where value is a threshold name, a
+# constant, or None for the 'isna'/'notna' operators.
+CATEGORY_RULES = [
+    ('No Leads', [('CPL', 'isna', None)]),
+    ('No Leads', [('Results', '==', 0)]),
+    ('Underperforming', [('CPL', '>', 'cpl_75th'), ('Click_to_Submit_Rate', '<', 'conversion_25th')]),
+    ('High CPL', [('CPL', '>', 'cpl_median')]),
+    ('Low Conversion', [('Click_to_Submit_Rate', '<', 'conversion_median')]),
+]
+DEFAULT_CATEGORY = 'Performing Well'
+
+_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+def category_thresholds(frame, quantiles=THRESHOLD_QUANTILES, within=None):
+    """Threshold values for ``frame``, one column per ``quantiles`` entry.
+
+    Returns a one-row DataFrame, or one row per group of ``within``. Missing
+    values are ignored, as in ``Series.quantile``.
+    """
+    columns = list(dict.fromkeys(col for col, _ in quantiles.values()))
+    levels = sorted({q for _, q in quantiles.values()})
+    if within is None:
+        computed = frame[columns].quantile(levels).unstack().to_frame().T
+    else:
+        computed = frame.groupby(within, observed=True)[columns].quantile(levels).unstack()
+    thresholds = pd.DataFrame(index=computed.index)
+    for name, (col, q) in quantiles.items():
+        thresholds[name] = computed[(col, q)]
+    return thresholds
+
+
+def _clause_mask(frame, thresholds, column, op, value):
+    values = frame[column].to_numpy(dtype='float64')
+    if op == 'isna':
+        return np.isnan(values)
+    if op == 'notna':
+        return ~np.isnan(values)
+    if op not in _OPERATORS:
+        raise ValueError(f"Unknown operator {op!r} in rule on {column!r}")
+    if isinstance(value, str):
+        value = thresholds[value].to_numpy(dtype='float64')
+    return _OPERATORS[op](values, value)
+
+
+def categorize(frame, rules=CATEGORY_RULES, thresholds=None, within=None, default=DEFAULT_CATEGORY,
+               quantiles=THRESHOLD_QUANTILES):
+    """Category of each row of ``frame`` under ``rules``.
+
+    ``thresholds`` defaults to :func:`category_thresholds` of ``frame`` itself
+    (per ``within`` group when given); a dict or one-row frame applies the
+    same thresholds to every row. Returns a Series aligned with ``frame``.
+    """
+    if thresholds is None:
+        thresholds = category_thresholds(frame, quantiles, within)
+    elif isinstance(thresholds, dict):
+        thresholds = pd.DataFrame([thresholds])
+
+    if within is None:
+        row_thresholds = thresholds.iloc[np.zeros(len(frame), dtype=np.intp)]
+    else:
+        keys = pd.MultiIndex.from_frame(frame[[within] if isinstance(within, str) else list(within)])
+        if thresholds.index.nlevels == 1:
+            keys = keys.get_level_values(0)
+        row_thresholds = thresholds.reindex(keys)
+
+    conditions = []
+    for _, clauses in rules:
+        mask = np.ones(len(frame), dtype=bool)
+        for column, op, value in clauses:
+            mask &= _clause_mask(frame, row_thresholds, column, op, value)
+        conditions.append(mask)
+    categories = list(dict.fromkeys([category for category, _ in rules] + [default]))
+    labels = np.select(conditions, [category for category, _ in rules], default=default)
+    return pd.Series(pd.Categorical(labels, categories=categories), index=frame.index, name='Category')
+
+
+def classify(frame, by, within=None, rules=CATEGORY_RULES, quantiles=THRESHOLD_QUANTILES):
+    """Roll ``frame`` up to ``by`` and categorize each group in one call.
+
+    ``frame`` is the lead cube or cleaned rows (any grain with the cube's
+    summed columns and per-row CPL, e.g. ``by='Campaign name'``). Returns the
+    rolled-up Results, CPL (mean of daily CPL, as in the reports),
+    Click_to_Submit_Rate and Category per group.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    if within is not None:
+        by += [col for col in ([within] if isinstance(within, str) else within) if col not in by]
+    if 'CPL_sum' not in frame.columns:
+        frame = partial_aggregate(frame, by, CUBE_SUM_COLUMNS, CUBE_MEAN_COLUMNS).reset_index()
+    table = rollup(frame, by, {
+        'Results': 'sum',
+        'Link clicks': 'sum',
+        'Amount spent (USD)': 'sum',
+        'CPL': 'ratio',
+        'Click_to_Submit_Rate': 'ratio',
+    })
+    table['Category'] = categorize(table, rules, within=within, quantiles=quantiles)
+    return table
@@ -0,0 +1,317 @@
+"""Shared cleaning step for the RAW DATA sheet.
+
+Every analysis script derives the same columns (Program, date parts, CPL and
+conversion rates) from the raw Meta export. They are defined once here so the
+scripts and the streaming batch reader produce identical frames.
+
+:func:`clean_campaign_frame` also enforces ``CLEAN_SCHEMA``, a compact dtype
+layout (categoricals for names, small ints for date parts and counts) that
+keeps multi-year, multi-client frames small in memory. Derived columns are
+added to the frame passed in; hand it a shallow copy (``df.copy(deep=False)``)
+to keep the raw frame unchanged without duplicating its data. Cleaning only
+ever replaces whole columns, never writes into one, so the columns a shallow
+copy shares are safe with or without pandas' copy-on-write mode.
+
+:func:`load_campaign_data` and :func:`iter_campaign_batches` accept a column
+list and row predicates (objective, date range, program) that are pushed down
+to the reader, so rows and columns a report never uses are not loaded.
+Rows repeating a (campaign, reporting window, objective) key, as overlapping
+exports pasted into one sheet do, are dropped before cleaning so they are not
+summed twice (see campaign_dedup.py). The rows read are then checked against
+the data-quality rules of campaign_validation.py before any derived value is
+computed from them. The rows an objective predicate leaves out are still
+checked against the rules on 'Objective', so an unknown objective is reported
+rather than silently filtered away.
+"""
+import numpy as np
+import pandas as pd
+
+from campaign_calendar import MONTH_NAME_DTYPE, date_features
+from campaign_dedup import as_deduplicator
+from campaign_ingest import (CACHE_DIR, DEFAULT_BATCH_SIZE, WORKBOOK_PATH, distinct_campaign_names,
+                             empty_raw_frame, iter_raw_batches, raw_columns)
+from campaign_resolver import CampaignResolver
+from campaign_validation import MODE_REPORT, as_validator, rule_columns
+
+# Manual mapping based on campaign names
+CAMPAIGN_MAPPING = {
+    'COLLEGE_WW_MSEM_Conversions_Nov24': 'MS in engineering management',
+    'COLLEGE_MSO_Conversions_WW_July24': 'Masters of space operations',
+    'COLLEGE_MSEM_Conversions_WW_July24': 'MS in engineering management',
+    'COLLEGE_BSE_Conversions_WW_July24': 'Bachelors of science in engineering',
+    'COLLEGE_MBAA_Conversions_WW_July24': 'MBA Airlines',
+    'COLLEGE_Military_Conversions_WW_July24': 'Military focused campaign',
+    'COLLEGE_MSM_Conversions_WW_July24': 'MS in management',
+    'COLLEGE_BSA_Conversions_WW_July24': 'Bachelors of science in aerospace'
+}
+
+# Raw columns the report scripts actually use
+REPORT_COLUMNS = ['Campaign name', 'Reporting starts', 'Amount spent (USD)', 'Results',
+                  'Link clicks', 'Landing page views', 'Impressions', 'Objective']
+
+# Raw columns add_derived_columns reads; always loaded alongside a projection
+DERIVATION_COLUMNS = ['Campaign name', 'Reporting starts', 'Amount spent (USD)', 'Results',
+                      'Link clicks', 'Landing page views']
+
+# Dtypes enforced on the cleaned frame. Spend and per-row CPL stay float64:
+# they are summed and averaged into currency figures, where float32 would drift
+# by cents. The per-row conversion rates are only ever displayed, so float32
+# is plenty for them.
+CLEAN_SCHEMA = {
+    'Campaign name': 'category',
+    'Program': 'category',
+    'Objective': 'category',
+    'Result indicator': 'category',
+    'Month_Name': MONTH_NAME_DTYPE,
+    'Month': 'int8',
+    'Quarter': 'int8',
+    'Week': 'int8',
+    'Year': 'int16',
+    'Year_Week': 'int32',
+    'Fiscal_Period': 'int32',
+    'Impressions': 'int32',
+    'Link clicks': 'int32',
+    'Landing page views': 'int32',
+    'Results': 'int32',
+    'Amount spent (USD)': 'float64',
+    'CPL': 'float64',
+    'Click_to_Submit_Rate': 'float32',
+    'LPV_to_Submit_Rate': 'float32',
+}
+
+
+def as_resolver(campaign_mapping):
+    """Accept either a campaign -> program dict or a ready CampaignResolver."""
+    if isinstance(campaign_mapping, CampaignResolver):
+        return campaign_mapping
+    return CampaignResolver(campaign_mapping)
+
+
+def add_derived_columns(df, campaign_mapping=CAMPAIGN_MAPPING):
+    """Add Program, date parts, CPL and conversion rates to a raw frame in place.
+
+    ``campaign_mapping`` is a dict of exact campaign names or a
+    CampaignResolver; unmatched campaigns keep their raw name as Program.
+    """
+    df['Program'] = as_resolver(campaign_mapping).resolve(df['Campaign name'])
+
+    # Parse dates; date parts come from the calendar dimension by day offset
+    df['Date'] = pd.to_datetime(df['Reporting starts'])
+    features = date_features(df['Date'])
+    for col in features.columns:
+        df[col] = features[col]
+
+    # Fill missing values with 0 for calculations
+    df['Link clicks'] = df['Link clicks'].fillna(0)
+    df['Landing page views'] = df['Landing page views'].fillna(0)
+    df['Results'] = df['Results'].fillna(0)
+
+    # Calculate CPL (Cost Per Lead)
+    df['CPL'] = np.where(df['Results'] > 0, df['Amount spent (USD)'] / df['Results'], np.nan)
+
+    # Calculate conversion rates
+    df['Click_to_Submit_Rate'] = np.where(df['Link clicks'] > 0,
+                                          (df['Results'] / df['Link clicks']) * 100, np.nan)
+    df['LPV_to_Submit_Rate'] = np.where(df['Landing page views'] > 0,
+                                        (df['Results'] / df['Landing page views']) * 100, np.nan)
+    return df
+
+
+def apply_clean_schema(df):
+    """Cast the columns present in ``df`` to ``CLEAN_SCHEMA`` in place."""
+    for col, dtype in CLEAN_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(dtype)) and df[col].hasnans:
+            df[col] = df[col].fillna(0)
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def clean_campaign_frame(df, campaign_mapping=CAMPAIGN_MAPPING):
+    """The shared cleaning step: derived columns plus the compact schema.
+
+    Only cleans; rows handed in directly are neither deduplicated nor
+    validated. Read through :func:`load_campaign_data` or
+    :func:`iter_campaign_batches` for that.
+    """
+    return apply_clean_schema(add_derived_columns(df, campaign_mapping))
+
+
+def concat_clean_batches(batches):
+    """Concatenate cleaned batches without losing their categorical columns.
+
+    pd.concat falls back to object dtype when batches carry different
+    categories, so the unordered categoricals are first aligned on the union
+    of their categories.
+    """
+    batches = list(batches)
+    for col in batches[0].columns:
+        dtype = batches[0][col].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and not dtype.ordered:
+            categories = set().union(*(batch[col].cat.categories for batch in batches))
+            categories = sorted(categories)
+            for batch in batches:
+                batch[col] = batch[col].cat.set_categories(categories)
+    return pd.concat(batches, ignore_index=True)
+
+
+def _former_derived_columns(df, campaign_mapping=CAMPAIGN_MAPPING):
+    # The derived columns as the scripts computed them before CLEAN_SCHEMA:
+    # Program and Month_Name as strings, date parts as pandas returns them
+    mapping = as_resolver(campaign_mapping).exact
+    df['Program'] = df['Campaign name'].map(mapping).fillna(df['Campaign name'])
+    df['Date'] = pd.to_datetime(df['Reporting starts'])
+    df['Month'] = df['Date'].dt.month
+    df['Month_Name'] = df['Date'].dt.strftime('%b')
+    df['Quarter'] = df['Date'].dt.quarter
+    df['Week'] = df['Date'].dt.isocalendar().week
+    df['Year'] = df['Date'].dt.year
+    for col in ['Link clicks', 'Landing page views', 'Results']:
+        df[col] = df[col].fillna(0)
+    df['CPL'] = np.where(df['Results'] > 0, df['Amount spent (USD)'] / df['Results'], np.nan)
+    df['Click_to_Submit_Rate'] = np.where(df['Link clicks'] > 0,
+                                          (df['Results'] / df['Link clicks']) * 100, np.nan)
+    df['LPV_to_Submit_Rate'] = np.where(df['Landing page views'] > 0,
+                                        (df['Results'] / df['Landing page views']) * 100, np.nan)
+    return df
+
+
+def schema_memory_report(df_raw, campaign_mapping=CAMPAIGN_MAPPING):
+    """Bytes per row of each column of the cleaned raw frame, before and after ``CLEAN_SCHEMA``.
+
+    'before' is the frame the scripts built before the shared cleaning step
+    (object strings, 64-bit numbers); 'after' is :func:`clean_campaign_frame`.
+    Columns only one of them has are blank on the other side.
+    """
+    before = _former_derived_columns(df_raw.copy(deep=False), campaign_mapping)
+    after = clean_campaign_frame(df_raw.copy(deep=False), campaign_mapping)
+    rows = max(len(df_raw), 1)
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'bytes_per_row_before': before.memory_usage(index=False, deep=True) / rows,
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_per_row_after': after.memory_usage(index=False, deep=True) / rows,
+    }).reindex(list(dict.fromkeys([*before.columns, *after.columns])))
+    report[['dtype_before', 'dtype_after']] = report[['dtype_before', 'dtype_after']].fillna('')
+    report.loc['Total'] = ['', report['bytes_per_row_before'].sum(),
+                           '', report['bytes_per_row_after'].sum()]
+    return report
+
+
+def _load_columns(columns):
+    if columns is None:
+        return None
+    return list(dict.fromkeys(list(columns) + DERIVATION_COLUMNS))
+
+
+def _audit_other_objectives(path, batch_size, cache_dir, objective, start, end, campaigns, programs,
+                            resolver, deduplicator, validator):
+    # The objective predicate would drop rows with an unknown objective
+    # before the rules see them, so check the rows it excludes against the
+    # rules on 'Objective'
+    rules = validator.rules_on('Objective')
+    if not rules:
+        return
+    filter_programs = programs is not None and campaigns is None
+    columns = rule_columns(rules)
+    if deduplicator is not None or filter_programs:
+        columns = list(dict.fromkeys(columns + ['Campaign name']))
+
+    def read_batches(load_columns):
+        return iter_raw_batches(path, batch_size=batch_size, cache_dir=cache_dir, columns=load_columns,
+                                start=start, end=end, campaigns=campaigns, exclude_objective=objective)
+
+    if deduplicator is None:
+        batches = read_batches(columns)
+    else:
+        # Deduplicated like the requested rows, without adding to their counts
+        batches = deduplicator.fresh().dedupe(read_batches, columns)
+
+    def in_programs(batches):
+        for batch in batches:
+            names = batch['Campaign name']
+            keep = names.isin(resolver.campaigns_for_programs(programs, names.dropna()))
+            if keep.any():
+                yield batch[keep]
+
+    validator.audit(in_programs(batches) if filter_programs else batches, rules)
+
+
+def iter_campaign_batches(path=WORKBOOK_PATH, batch_size=DEFAULT_BATCH_SIZE,
+                          campaign_mapping=CAMPAIGN_MAPPING, columns=None,
+                          objective=None, start=None, end=None, programs=None, cache_dir=CACHE_DIR,
+                          dedupe=True, validate=MODE_REPORT):
+    """Yield cleaned RAW DATA batches (derived columns added, ``CLEAN_SCHEMA`` applied).
+
+    ``columns`` selects raw columns to load (the columns the derived values
+    need are always added). ``objective``, ``start``/``end`` (on 'Reporting
+    starts', inclusive) and ``programs`` drop rows while reading. Pass a
+    CampaignResolver as ``campaign_mapping`` to collect unmatched campaigns.
+    ``cache_dir`` is the Parquet cache root used for the workbook.
+
+    Rows superseded by a later row with the same natural key are dropped;
+    pass a Deduplicator as ``dedupe`` to collect what was dropped, or
+    ``dedupe=False`` to keep every row.
+
+    ``validate`` is a campaign_validation mode ('report', 'quarantine' or
+    'fail'), a Validator to collect violation counts and samples, or None to
+    skip the checks. The columns the rules read are loaded for them and
+    dropped again before cleaning. With an ``objective`` predicate, the rows
+    it excludes (within the other predicates) are checked against the rules
+    on 'Objective' first; they are counted and sampled but never yielded.
+    """
+    resolver = as_resolver(campaign_mapping)
+    campaigns = None
+    if programs is not None:
+        programs = [programs] if isinstance(programs, str) else list(programs)
+        # Programs are derived, so the predicate is pushed down as the set of
+        # raw campaign names that resolve to them, when those are known upfront
+        known_campaigns = distinct_campaign_names(path, cache_dir)
+        if known_campaigns is not None:
+            campaigns = resolver.campaigns_for_programs(programs, known_campaigns)
+
+    def read_batches(load_columns):
+        return iter_raw_batches(path, batch_size=batch_size, cache_dir=cache_dir, columns=load_columns,
+                                objective=objective, start=start, end=end, campaigns=campaigns)
+
+    load_columns = read_columns = _load_columns(columns)
+    validator = as_validator(validate)
+    if validator is not None and load_columns is not None:
+        read_columns = list(dict.fromkeys(load_columns + validator.columns))
+
+    # The filters only drop whole keys, so deduplicating the filtered rows
+    # gives the same rows as filtering the deduplicated sheet
+    deduplicator = as_deduplicator(dedupe)
+    if validator is not None and objective is not None:
+        _audit_other_objectives(path, batch_size, cache_dir, objective, start, end, campaigns, programs,
+                                resolver, deduplicator, validator)
+    if deduplicator is None:
+        batches = read_batches(read_columns)
+    else:
+        batches = deduplicator.dedupe(read_batches, read_columns)
+    if validator is not None:
+        batches = validator.validate(batches)
+    for batch in batches:
+        if read_columns is not load_columns:
+            batch = batch[load_columns]
+        batch = clean_campaign_frame(batch, resolver)
+        if programs is not None and campaigns is None:
+            batch = batch[batch['Program'].isin(programs)]
+            if batch.empty:
+                continue
+        yield batch
+
+
+def load_campaign_data(path=WORKBOOK_PATH, campaign_mapping=CAMPAIGN_MAPPING, columns=None,
+                       objective=None, start=None, end=None, programs=None, dedupe=True,
+                       validate=MODE_REPORT):
+    """Load the cleaned rows matching the predicates as a single DataFrame."""
+    batches = list(iter_campaign_batches(path, campaign_mapping=campaign_mapping, columns=columns,
+                                         objective=objective, start=start, end=end,
+                                         programs=programs, dedupe=dedupe, validate=validate))
+    if not batches:
+        # Typed like the rows would have been, from the raw schema and CLEAN_SCHEMA
+        empty = empty_raw_frame(_load_columns(columns) if columns is not None else raw_columns(path))
+        return clean_campaign_frame(empty, campaign_mapping)
+    return concat_clean_batches(batches)
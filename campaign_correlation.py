@@ -0,0 +1,193 @@
+"""Lagged cross-correlation of engagement metrics against leads.
+
+For every program (plus ``'All'``, the summed series), every engagement
+metric and every lag 0..K, the Pearson correlation between the metric ``lag``
+periods earlier and leads in the current period:
+
+    corr(metric[t - lag], leads[t])
+
+is computed at daily or weekly grain. The cube is laid out once as a dense
+program x period x metric array (periods without rows are zero), and all
+correlations come from a handful of array passes:
+
+- the lagged cross products ``sum_t metric[t] * leads[t + lag]`` for all lags
+  at once from one FFT cross-correlation along the period axis;
+- the windowed sums and sums of squares of each side from prefix sums.
+
+Each program is correlated only over its own active span, its first to last
+period with rows, so the zeros before a campaign launched and after it ended
+do not count as observations. A correlation also needs
+``MIN_NONZERO_OBSERVATIONS`` overlapping periods where both the metric and
+leads are non-zero; a campaign with a handful of leads is not scored.
+
+A positive correlation at ``lag >= 1`` makes the metric a leading indicator
+of leads.
+"""
+import numpy as np
+import pandas as pd
+
+ENGAGEMENT_METRICS = ['Impressions', 'Link clicks', 'Landing page views', 'Amount spent (USD)']
+LEAD_COLUMN = 'Results'
+GRAINS = ('day', 'week')
+ALL_PROGRAMS = 'All'
+
+# Correlations over fewer overlapping periods than this, or fewer periods
+# where both sides are non-zero, are reported as NaN
+MIN_OBSERVATIONS = 3
+MIN_NONZERO_OBSERVATIONS = 8
+
+
+def _period_numbers(dates, grain):
+    days = dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    if grain == 'day':
+        return days
+    if grain == 'week':
+        # 1970-01-01 is a Thursday; shift so periods are Monday-based ISO weeks
+        return (days + 3) // 7
+    raise ValueError(f"Unknown grain {grain!r}; expected one of {GRAINS}")
+
+
+def dense_series(cube, columns, grain='week'):
+    """Lay the cube out as a ``(program, period, column)`` array.
+
+    Periods are consecutive days or ISO weeks from the first to the last
+    period in the cube. The last program row is the sum over all programs.
+    Returns ``(values, programs, periods, spans)`` where ``periods`` are the
+    first day of each period and ``spans`` the ``(first, last)`` period index
+    each program has rows in (the whole range for the sum).
+    """
+    programs = cube['Program'].astype(str)
+    labels = pd.Index(sorted(programs.unique()))
+    periods = _period_numbers(cube['Date'], grain)
+    first = periods.min() if len(periods) else 0
+    n_periods = int(periods.max() - first + 1) if len(periods) else 0
+
+    values = np.zeros((len(labels) + 1, n_periods, len(columns)))
+    rows = labels.get_indexer(programs)
+    np.add.at(values, (rows, periods - first), cube[list(columns)].to_numpy(dtype='float64'))
+    values[-1] = values[:-1].sum(axis=0)
+
+    spans = np.tile([0, max(n_periods - 1, 0)], (len(labels) + 1, 1))
+    if len(periods):
+        spans[:-1, 0] = n_periods
+        spans[:-1, 1] = -1
+        np.minimum.at(spans[:, 0], rows, periods - first)
+        np.maximum.at(spans[:, 1], rows, periods - first)
+
+    period_days = np.arange(first, first + n_periods)
+    if grain == 'week':
+        period_days = period_days * 7 - 3
+    starts = pd.to_datetime(period_days.astype('datetime64[D]'))
+    return values, labels.append(pd.Index([ALL_PROGRAMS])), starts, spans
+
+
+def align_spans(values, spans):
+    """Shift each program's series so its span starts at period 0, zero after it.
+
+    Returns ``(aligned, lengths)``; ``lengths`` is each span's period count.
+    """
+    lengths = np.maximum(spans[:, 1] - spans[:, 0] + 1, 0)
+    source = spans[:, :1] + np.arange(values.shape[1])
+    inside = np.arange(values.shape[1]) < lengths[:, None]
+    aligned = np.take_along_axis(values, np.where(inside, source, 0)[..., None], axis=1)
+    return np.where(inside[..., None], aligned, 0), lengths
+
+
+def _prefix(values):
+    # Prefix sums along the period axis with a leading zero
+    shape = values.shape[:-1] + (1,)
+    return np.concatenate([np.zeros(shape), np.cumsum(values, axis=-1)], axis=-1)
+
+
+def _lagged_products(x, y, max_lag):
+    # sum_t x[..., t] * y[..., t + lag] for lags 0..max_lag from one FFT
+    n_time = x.shape[-1]
+    n_fft = 1 << max(int(2 * n_time - 1), 1).bit_length()
+    spectrum = np.conj(np.fft.rfft(x, n_fft)) * np.fft.rfft(y, n_fft)
+    cross = np.fft.irfft(spectrum, n_fft)[..., :max_lag + 1]
+    if max_lag >= n_time:
+        cross[..., n_time:] = 0
+    return cross
+
+
+def lag_correlations(x, y, max_lag, lengths=None):
+    """Pearson correlation of ``x[..., t - lag]`` with ``y[..., t]`` for lags 0..max_lag.
+
+    ``x`` and ``y`` are arrays whose last axis is time and whose leading axes
+    broadcast together. ``lengths`` (broadcasting like the leading axes)
+    limits each series to its first ``lengths`` periods; values after them
+    must be zero. Returns ``(correlations, observations, nonzero)`` with a
+    trailing lag axis, where ``nonzero`` counts the overlapping periods with
+    both sides non-zero. Correlations with zero variance, fewer than
+    ``MIN_OBSERVATIONS`` overlapping periods or fewer than
+    ``MIN_NONZERO_OBSERVATIONS`` non-zero ones are NaN.
+    """
+    x, y = np.broadcast_arrays(np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64'))
+    n_time = x.shape[-1]
+    lengths = np.broadcast_to(n_time if lengths is None else np.asarray(lengths), x.shape[:-1])[..., None]
+    lags = np.arange(max_lag + 1)
+    n = np.maximum(lengths - lags, 0)
+
+    cross = _lagged_products(x, y, max_lag)
+    nonzero = np.rint(_lagged_products((x != 0).astype('float64'), (y != 0).astype('float64'), max_lag))
+
+    # x covers periods [0, length - lag), y covers [lag, length)
+    clipped = np.minimum(lags, lengths)
+    ends = np.broadcast_to(lengths, clipped.shape)
+    x_sum, x_sq = _prefix(x), _prefix(x * x)
+    y_sum, y_sq = _prefix(y), _prefix(y * y)
+    sx = np.take_along_axis(x_sum, ends - clipped, axis=-1)
+    sxx = np.take_along_axis(x_sq, ends - clipped, axis=-1)
+    sy = np.take_along_axis(y_sum, ends, axis=-1) - np.take_along_axis(y_sum, clipped, axis=-1)
+    syy = np.take_along_axis(y_sq, ends, axis=-1) - np.take_along_axis(y_sq, clipped, axis=-1)
+
+    covariance = n * cross - sx * sy
+    x_var = n * sxx - sx * sx
+    y_var = n * syy - sy * sy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlations = covariance / np.sqrt(x_var * y_var)
+    # Relative tolerance: constant series leave only rounding noise in the variance
+    valid = ((x_var > 1e-12 * n * sxx) & (y_var > 1e-12 * n * syy) & (n >= MIN_OBSERVATIONS)
+             & (nonzero >= MIN_NONZERO_OBSERVATIONS))
+    return np.where(valid, np.clip(correlations, -1, 1), np.nan), n, nonzero.astype(np.int64)
+
+
+def correlation_table(cube, max_lag=4, metrics=ENGAGEMENT_METRICS, target=LEAD_COLUMN, grains=GRAINS):
+    """Tidy table of every grain x program x metric x lag correlation.
+
+    Columns: Grain, Program, Metric, Lag (in periods of the grain),
+    Correlation, Observations (overlapping periods within the program's
+    active span) and Nonzero_Observations (those with both sides non-zero).
+    """
+    tables = []
+    for grain in grains:
+        values, programs, _, spans = dense_series(cube, list(metrics) + [target], grain)
+        values, lengths = align_spans(values, spans)
+        # (program, metric, period) against the program's lead series
+        engagement = np.moveaxis(values[..., :-1], -1, 1)
+        leads = values[:, None, :, -1]
+        correlations, observations, nonzero = lag_correlations(engagement, leads, max_lag, lengths[:, None])
+
+        index = pd.MultiIndex.from_product([programs, metrics, range(max_lag + 1)],
+                                           names=['Program', 'Metric', 'Lag'])
+        table = pd.DataFrame({'Correlation': correlations.ravel(),
+                              'Observations': np.broadcast_to(observations, correlations.shape).ravel(),
+                              'Nonzero_Observations': nonzero.ravel()},
+                             index=index).reset_index()
+        table.insert(0, 'Grain', grain)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
+def best_leading_indicators(correlations, min_lag=1):
+    """Strongest positive leading indicator per grain and program, ranked.
+
+    Only lags of at least ``min_lag`` periods count as leading. Returns one
+    row per grain and program with the metric, lag and correlation, sorted by
+    correlation within each grain.
+    """
+    leading = correlations[(correlations['Lag'] >= min_lag) & (correlations['Correlation'] > 0)]
+    best = leading.loc[leading.groupby(['Grain', 'Program'])['Correlation'].idxmax()]
+    best = best.sort_values(['Grain', 'Correlation'], ascending=[True, False])
+    best['Rank'] = best.groupby('Grain').cumcount() + 1
+    return best.reset_index(drop=True)
@@ -0,0 +1,289 @@
+"""Natural-key deduplication of overlapping exports.
+
+Meta exports pulled for overlapping date ranges repeat the same reporting
+windows, and summing them inflates results and spend. A row's natural key is
+(campaign, reporting window, objective); when a key appears more than once
+only its latest version, the last occurrence in read order, is kept. Pass
+exports oldest first, so a re-pulled window replaces the earlier one.
+
+:class:`Deduplicator` streams the rows twice. The first pass reads only the
+key columns and encodes each key column to int64 dictionary codes
+(``pd.factorize`` per batch, with one dictionary per column shared across
+batches, so no Python per row). Keys are compared on their codes, which are
+equal exactly when the values are, so two different keys can never be taken
+for one. Codes are grouped in memory up to ``memory_rows`` rows; beyond that
+they are spilled to partition files by a hash of the codes and grouped one
+partition at a time, so memory stays bounded however many rows the exports
+hold. Only the positions of superseded rows are kept for the second pass,
+which streams the full batches and drops them.
+
+Dropped rows are counted per campaign, with the results and spend they would
+have added, in :meth:`Deduplicator.dropped_report`.
+
+Usage:
+    python campaign_dedup.py export_a.xlsx export_b.xlsx
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from collections import Counter
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from campaign_ingest import WORKBOOK_PATH, iter_raw_batches
+
+DEDUP_KEY = ['Campaign name', 'Reporting starts', 'Reporting ends', 'Objective']
+
+# Key codes grouped in memory at once (8 bytes per key column plus 8 for the
+# position, 40 bytes a row for DEDUP_KEY); larger inputs spill to
+# SPILL_PARTITIONS files
+DEDUP_MEMORY_ROWS = 4_000_000
+SPILL_PARTITIONS = 64
+
+# Multiplier of the spill partition hash: 2**64 divided by the golden ratio
+_FIBONACCI = np.uint64(0x9E3779B97F4A7C15)
+
+# Columns whose dropped totals are reported, when loaded
+DROPPED_TOTAL_COLUMNS = {'Results': 'Results_Dropped', 'Amount spent (USD)': 'Spend_Dropped'}
+
+
+class KeyCodes:
+    """Encode natural keys to int64 codes, consistently across batches.
+
+    Each key column has its own dictionary from value to code, filled as new
+    values appear, so equal values get equal codes in every batch whether
+    names are held as strings or categoricals. Only each batch's distinct
+    values go through the dictionary; dates are looked up by their integer
+    nanoseconds rather than as Timestamps. Nulls all get code -1.
+    """
+
+    def __init__(self, key=DEDUP_KEY):
+        self.key = list(key)
+        self.dictionaries = [{} for _ in self.key]
+
+    def encode(self, frame):
+        """``(len(frame), len(key))`` int64 codes of each row's key."""
+        codes = np.empty((len(frame), len(self.key)), dtype=np.int64)
+        for i, (col, dictionary) in enumerate(zip(self.key, self.dictionaries)):
+            local, uniques = pd.factorize(frame[col])
+            values = np.asarray(uniques)
+            if values.dtype.kind in 'mM':
+                values = values.astype(f'{values.dtype.kind}8[ns]').view(np.int64)
+            mapping = np.array([dictionary.setdefault(value, len(dictionary)) for value in values.tolist()] + [-1],
+                               dtype=np.int64)
+            # Null values are factorized to -1, the last entry of the mapping
+            codes[:, i] = mapping[local]
+        return codes
+
+    def combine(self, codes):
+        """``codes`` folded into one int64 column when the dictionaries are small enough.
+
+        Each row's codes are read as the digits of one mixed-radix number, so
+        rows get equal numbers exactly when their codes are equal, and sorting
+        one column is much cheaper than sorting ``len(key)``. The dictionaries
+        must not grow afterwards, so call this once every batch is encoded.
+        """
+        sizes = [len(dictionary) + 1 for dictionary in self.dictionaries]
+        if np.prod(sizes, dtype=float) >= 2.0 ** 63:
+            return codes
+        combined = np.zeros(len(codes), dtype=np.int64)
+        for i, size in enumerate(sizes):
+            combined *= size
+            combined += codes[:, i] + 1
+        return combined[:, None]
+
+
+def superseded_positions(codes, positions):
+    """Sorted positions of rows whose key occurs again later; returns ``(positions, keys)``.
+
+    ``codes`` holds one row of key codes per position. ``keys`` is the number
+    of distinct keys that had duplicates.
+    """
+    if not len(codes):
+        return np.empty(0, np.int64), 0
+    order = np.lexsort((positions, *codes.T[::-1]))
+    codes, positions = codes[order], positions[order]
+    repeated = (codes[1:] == codes[:-1]).all(axis=1)
+    superseded = np.r_[repeated, False]
+    first_of_key = np.r_[True, ~repeated]
+    return np.sort(positions[superseded]), int(np.count_nonzero(first_of_key & superseded))
+
+
+class _CodeSpill:
+    # Partition files of (key codes, position) records, partitioned by a hash
+    # of the codes so every occurrence of a key lands in the same file
+    def __init__(self, columns, spill_dir=None, partitions=SPILL_PARTITIONS):
+        self.dir = tempfile.mkdtemp(prefix='dedup-', dir=spill_dir)
+        self.columns = columns
+        self.partitions = partitions
+        self.shift = np.uint64(64 - int(np.log2(partitions)))
+
+    def _path(self, part):
+        return os.path.join(self.dir, f'part-{part:03d}.bin')
+
+    def write(self, codes, positions):
+        records = np.column_stack([codes, positions])
+        # Fibonacci hashing of the codes; the top bits pick the partition
+        mixed = np.zeros(len(codes), dtype=np.uint64)
+        for i in range(self.columns):
+            mixed ^= codes[:, i].astype(np.uint64)
+            mixed *= _FIBONACCI
+        parts = (mixed >> self.shift).astype(np.int64)
+        order = np.argsort(parts, kind='stable')
+        bounds = np.searchsorted(parts[order], np.arange(self.partitions + 1))
+        for part in np.flatnonzero(np.diff(bounds)):
+            with open(self._path(part), 'ab') as fh:
+                records[order[bounds[part]:bounds[part + 1]]].tofile(fh)
+
+    def partitions_records(self):
+        for part in range(self.partitions):
+            if os.path.exists(self._path(part)):
+                records = np.fromfile(self._path(part), dtype=np.int64).reshape(-1, self.columns + 1)
+                yield records[:, :-1], records[:, -1]
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class Deduplicator:
+    """Drop all but the last occurrence of each natural key from a batch stream.
+
+    Like the resolver's unmatched counts, the statistics add up over every
+    stream deduplicated: :attr:`rows` read, :attr:`duplicate_keys` seen more
+    than once and :attr:`dropped` rows per campaign.
+    """
+
+    def __init__(self, key=DEDUP_KEY, memory_rows=DEDUP_MEMORY_ROWS, spill_dir=None):
+        self.key = list(key)
+        self.memory_rows = memory_rows
+        self.spill_dir = spill_dir
+        self.rows = 0
+        self.duplicate_keys = 0
+        self.dropped = Counter()
+        self.dropped_totals = Counter()
+
+    @property
+    def duplicates(self):
+        return sum(self.dropped.values())
+
+    def fresh(self):
+        """A Deduplicator with the same settings and no statistics."""
+        return Deduplicator(self.key, self.memory_rows, self.spill_dir)
+
+    def stats(self):
+        """The statistics so far, as plain values; see :meth:`add_stats`."""
+        return {'rows': self.rows, 'duplicate_keys': self.duplicate_keys,
+                'dropped': dict(self.dropped), 'dropped_totals': dict(self.dropped_totals)}
+
+    def add_stats(self, stats):
+        """Add statistics from :meth:`stats`, e.g. those stored with a cache built earlier."""
+        self.rows += stats['rows']
+        self.duplicate_keys += stats['duplicate_keys']
+        self.dropped.update(stats['dropped'])
+        self.dropped_totals.update(stats['dropped_totals'])
+
+    def find_superseded(self, key_batches):
+        """Sorted positions (in read order) of the rows a later row supersedes."""
+        encoder = KeyCodes(self.key)
+        codes, positions, spill = [], [], None
+        position = held = 0
+        try:
+            for batch in key_batches:
+                codes.append(encoder.encode(batch))
+                positions.append(np.arange(position, position + len(batch), dtype=np.int64))
+                position += len(batch)
+                held += len(batch)
+                if held > self.memory_rows:
+                    spill = spill or _CodeSpill(len(self.key), self.spill_dir)
+                    spill.write(np.concatenate(codes), np.concatenate(positions))
+                    codes, positions, held = [], [], 0
+            self.rows += position
+            if spill is None:
+                superseded, keys = superseded_positions(
+                    encoder.combine(np.concatenate(codes)) if codes else np.empty((0, len(self.key)), np.int64),
+                    np.concatenate(positions) if positions else np.empty(0, np.int64))
+                self.duplicate_keys += keys
+                return superseded
+            if codes:
+                spill.write(np.concatenate(codes), np.concatenate(positions))
+            parts = []
+            for part_codes, part_positions in spill.partitions_records():
+                superseded, keys = superseded_positions(encoder.combine(part_codes), part_positions)
+                parts.append(superseded)
+                self.duplicate_keys += keys
+            return np.sort(np.concatenate(parts)) if parts else np.empty(0, np.int64)
+        finally:
+            if spill is not None:
+                spill.close()
+
+    def dedupe(self, read_batches, columns=None):
+        """Yield the batches of ``read_batches(columns)`` without superseded rows.
+
+        ``read_batches(columns)`` must return a fresh iterator over the same
+        rows in the same order each time it is called; it is called once with
+        the key columns and once with ``columns``.
+        """
+        superseded = self.find_superseded(read_batches(self.key))
+        if not len(superseded):
+            yield from read_batches(columns)
+            return
+
+        position = 0
+        for batch in read_batches(columns):
+            lo, hi = np.searchsorted(superseded, [position, position + len(batch)])
+            local = superseded[lo:hi] - position
+            position += len(batch)
+            if not len(local):
+                yield batch
+                continue
+            self._count_dropped(batch.iloc[local])
+            keep = np.ones(len(batch), dtype=bool)
+            keep[local] = False
+            if keep.any():
+                yield batch[keep]
+
+    def _count_dropped(self, rows):
+        self.dropped.update(rows['Campaign name'].astype(str).value_counts().to_dict())
+        for col, name in DROPPED_TOTAL_COLUMNS.items():
+            if col in rows.columns:
+                self.dropped_totals[name] += float(rows[col].sum())
+
+    def dropped_report(self):
+        """Dropped duplicate rows per campaign, most first."""
+        return pd.DataFrame(self.dropped.most_common(), columns=['Campaign name', 'Rows'])
+
+
+def as_deduplicator(dedupe):
+    """A Deduplicator for ``dedupe=True``, the given one, or None for ``False``."""
+    if isinstance(dedupe, Deduplicator):
+        return dedupe
+    return Deduplicator() if dedupe else None
+
+
+def iter_export_batches(paths, columns=None, **filters):
+    """Raw batches of several exports read one after another, oldest first."""
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+    return chain.from_iterable(iter_raw_batches(path, columns=columns, **filters) for path in paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('exports', nargs='*', default=[WORKBOOK_PATH], help='Workbook exports, oldest first')
+    args = parser.parse_args()
+
+    deduplicator = Deduplicator()
+    kept = sum(len(batch) for batch in deduplicator.dedupe(
+        lambda columns: iter_export_batches(args.exports, columns=columns)))
+    print(f"Read {deduplicator.rows} rows from {len(args.exports)} export(s): {kept} kept, "
+          f"{deduplicator.duplicates} duplicates of {deduplicator.duplicate_keys} keys dropped")
+    if deduplicator.duplicates:
+        print(f"Dropped totals: {deduplicator.dropped_totals['Results_Dropped']:,.0f} results, "
+              f"${deduplicator.dropped_totals['Spend_Dropped']:,.2f} spend")
+        print(deduplicator.dropped_report().to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
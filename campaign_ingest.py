@@ -0,0 +1,280 @@
+"""Shared ingest for the campaign workbook.
+
+Parsing the workbook through openpyxl is the slowest part of every run, so the
+sheets are converted once into Parquet files under ``.cache/`` keyed by the
+SHA-256 of the workbook contents. Later runs read the Parquet copy and only
+re-parse the workbook when its bytes change.
+
+Exports too large to hold in memory can be read with :func:`iter_raw_batches`,
+which yields fixed-size DataFrames from the cache or, on a cache miss, straight
+from openpyxl's read-only row iterator (writing the cache as it goes). Column
+projections and row predicates are applied while reading, so filtered-out rows
+and unused columns are never materialized.
+"""
+import hashlib
+import operator
+import os
+from functools import lru_cache, reduce
+from itertools import islice
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+WORKBOOK_PATH = 'Mediately Data Scientist.xlsx'
+RAW_SHEET = 'RAW DATA'
+KEY_SHEET = 'Campaign Name Key'
+CACHE_DIR = '.cache'
+
+_SHEET_FILES = {RAW_SHEET: 'raw_data.parquet', KEY_SHEET: 'campaign_key.parquet'}
+
+DEFAULT_BATCH_SIZE = 50_000
+
+# Column types of the RAW DATA sheet as pd.read_excel infers them on the sample
+# workbook. Streamed batches are coerced to these so every batch has the same
+# dtypes regardless of which values happen to fall into it.
+RAW_DATE_COLUMNS = ['Reporting starts', 'Reporting ends']
+RAW_FLOAT_COLUMNS = ['Amount spent (USD)', 'Link clicks', 'Results', 'Landing page views']
+RAW_INT_COLUMNS = ['Impressions']
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the hex SHA-256 of a file's contents.
+
+    Memoized per process on the file's path, size and modification time, so
+    the workbook is hashed once per run however many cache lookups it serves.
+    """
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns, chunk_size)
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path, size, mtime_ns, chunk_size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def workbook_cache_dir(path=WORKBOOK_PATH, cache_dir=CACHE_DIR):
+    """Directory holding the cached sheets for the current workbook contents."""
+    return os.path.join(cache_dir, 'workbooks', file_digest(path))
+
+
+def _normalize_object_columns(df):
+    # Excel columns such as 'Objective' mix strings and numbers ('Leads' and 0),
+    # which Parquet cannot store in one column. Keep nulls, stringify the rest.
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str)).infer_objects()
+    return df
+
+
+def _write_parquet(df, path):
+    tmp_path = f"{path}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def load_sheet(sheet_name, path=WORKBOOK_PATH, cache_dir=CACHE_DIR):
+    """Load one workbook sheet, parsing the workbook only on a cache miss.
+
+    RAW DATA is converted by the same streaming pass as
+    :func:`iter_raw_batches`, so its cache entry has one schema whichever
+    entry point filled it.
+    """
+    if sheet_name == RAW_SHEET:
+        return pd.read_parquet(cache_raw_sheet(path, cache_dir))
+
+    target_dir = workbook_cache_dir(path, cache_dir)
+    target = os.path.join(target_dir, _SHEET_FILES[sheet_name])
+    if os.path.exists(target):
+        return pd.read_parquet(target)
+
+    os.makedirs(target_dir, exist_ok=True)
+    df = _normalize_object_columns(pd.read_excel(path, sheet_name=sheet_name))
+    _write_parquet(df, target)
+    return df
+
+
+def load_sheets(path=WORKBOOK_PATH, cache_dir=CACHE_DIR):
+    """Return ``(df_key, df_raw)`` for the workbook, served from the cache when possible."""
+    return load_sheet(KEY_SHEET, path, cache_dir), load_sheet(RAW_SHEET, path, cache_dir)
+
+
+def _coerce_raw_batch(df):
+    for col in RAW_DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    for col in RAW_FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    for col in RAW_INT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int64')
+    return _normalize_object_columns(df)
+
+
+def _raw_arrow_schema(header):
+    fields = []
+    for col in header:
+        if col in RAW_DATE_COLUMNS:
+            fields.append(pa.field(col, pa.timestamp('us')))
+        elif col in RAW_FLOAT_COLUMNS:
+            fields.append(pa.field(col, pa.float64()))
+        elif col in RAW_INT_COLUMNS:
+            fields.append(pa.field(col, pa.int64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def empty_raw_frame(columns):
+    """A RAW DATA frame of ``columns`` with no rows, typed like the streamed batches."""
+    return _raw_arrow_schema(columns).empty_table().to_pandas()
+
+
+def _iter_workbook_batches(path, sheet_name, batch_size, cache_path=None):
+    # When cache_path is given, every batch is also appended to a Parquet file
+    # that replaces the cache entry once the sheet has been read to the end.
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    writer = None
+    tmp_path = f"{cache_path}.tmp" if cache_path else None
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            schema = _raw_arrow_schema(header)
+            writer = pq.ParquetWriter(tmp_path, schema)
+        # Trailing formatted-but-empty rows come back as all-None tuples
+        rows = (row for row in rows if any(value is not None for value in row))
+        for chunk in iter(lambda: list(islice(rows, batch_size)), []):
+            batch = _coerce_raw_batch(pd.DataFrame.from_records(chunk, columns=header))
+            if writer is not None:
+                writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+            yield batch
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(tmp_path, cache_path)
+    finally:
+        workbook.close()
+        if writer is not None:
+            # Abandoned part-way through: never leave a truncated cache entry
+            writer.close()
+            os.remove(tmp_path)
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def _arrow_filter(objective, start, end, campaigns, exclude_objective=None):
+    conditions = []
+    # Value sets are typed explicitly: an empty list would infer the null type
+    if objective is not None:
+        conditions.append(ds.field('Objective').isin(pa.array(objective, type=pa.string())))
+    if exclude_objective is not None:
+        field = ds.field('Objective')
+        conditions.append(~field.isin(pa.array(exclude_objective, type=pa.string())) | field.is_null())
+    if start is not None:
+        conditions.append(ds.field('Reporting starts') >= pd.Timestamp(start).to_pydatetime())
+    if end is not None:
+        conditions.append(ds.field('Reporting starts') <= pd.Timestamp(end).to_pydatetime())
+    if campaigns is not None:
+        conditions.append(ds.field('Campaign name').isin(pa.array(campaigns, type=pa.string())))
+    return reduce(operator.and_, conditions) if conditions else None
+
+
+def _filter_batch(df, columns, objective, start, end, campaigns, exclude_objective=None):
+    mask = pd.Series(True, index=df.index)
+    if objective is not None:
+        mask &= df['Objective'].isin(objective)
+    if exclude_objective is not None:
+        mask &= ~df['Objective'].isin(exclude_objective)
+    if start is not None:
+        mask &= df['Reporting starts'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['Reporting starts'] <= pd.Timestamp(end)
+    if campaigns is not None:
+        mask &= df['Campaign name'].isin(campaigns)
+    df = df if mask.all() else df[mask]
+    return df if columns is None else df[columns]
+
+
+def iter_raw_batches(path=WORKBOOK_PATH, batch_size=DEFAULT_BATCH_SIZE, cache_dir=CACHE_DIR,
+                     columns=None, objective=None, start=None, end=None, campaigns=None,
+                     exclude_objective=None):
+    """Yield the RAW DATA sheet as DataFrames of at most ``batch_size`` rows.
+
+    Only one batch is held in memory at a time. Batches are read from the
+    Parquet cache when the workbook has already been converted, otherwise from
+    the workbook through openpyxl in read-only mode, filling the cache on the
+    way so the next read is a cache hit.
+
+    ``columns`` restricts the columns returned. ``objective`` and ``campaigns``
+    keep rows whose 'Objective' / 'Campaign name' is one of the given values,
+    and ``start``/``end`` bound 'Reporting starts' (both inclusive).
+    ``exclude_objective`` drops rows whose 'Objective' is one of the given
+    values (rows without one are kept). On a cache hit the filters are
+    evaluated by Arrow before rows reach pandas.
+    """
+    columns, objective, campaigns = _as_list(columns), _as_list(objective), _as_list(campaigns)
+    exclude_objective = _as_list(exclude_objective)
+    cached = os.path.join(workbook_cache_dir(path, cache_dir), _SHEET_FILES[RAW_SHEET])
+    if os.path.exists(cached):
+        dataset = ds.dataset(cached, format='parquet')
+        record_batches = dataset.to_batches(columns=columns,
+                                            filter=_arrow_filter(objective, start, end, campaigns,
+                                                                 exclude_objective),
+                                            batch_size=batch_size)
+        for record_batch in record_batches:
+            if record_batch.num_rows:
+                yield record_batch.to_pandas()
+    else:
+        for batch in _iter_workbook_batches(path, RAW_SHEET, batch_size, cache_path=cached):
+            batch = _filter_batch(batch, columns, objective, start, end, campaigns, exclude_objective)
+            if len(batch):
+                yield batch
+
+
+def cache_raw_sheet(path=WORKBOOK_PATH, cache_dir=CACHE_DIR):
+    """Convert the RAW DATA sheet to its Parquet cache entry if needed and return its path."""
+    cached = os.path.join(workbook_cache_dir(path, cache_dir), _SHEET_FILES[RAW_SHEET])
+    if not os.path.exists(cached):
+        for _ in _iter_workbook_batches(path, RAW_SHEET, DEFAULT_BATCH_SIZE, cache_path=cached):
+            pass
+    return cached
+
+
+def raw_row_count(path=WORKBOOK_PATH, cache_dir=CACHE_DIR):
+    """Number of rows in the RAW DATA sheet, from the Parquet metadata.
+
+    A workbook not cached yet is converted first, so counting it costs the
+    one parse the following read would have paid anyway.
+    """
+    return pq.ParquetFile(cache_raw_sheet(path, cache_dir)).metadata.num_rows
+
+
+def raw_columns(path=WORKBOOK_PATH, cache_dir=CACHE_DIR):
+    """Column names of the RAW DATA sheet, from the Parquet schema."""
+    return pq.read_schema(cache_raw_sheet(path, cache_dir)).names
+
+
+def distinct_campaign_names(path=WORKBOOK_PATH, cache_dir=CACHE_DIR):
+    """Distinct 'Campaign name' values from the cache, or None when not cached."""
+    cached = os.path.join(workbook_cache_dir(path, cache_dir), _SHEET_FILES[RAW_SHEET])
+    if not os.path.exists(cached):
+        return None
+    column = pq.read_table(cached, columns=['Campaign name']).column(0)
+    return [name for name in column.unique().to_pylist() if name is not None]
@@ -0,0 +1,129 @@
+"""Partitioned cube aggregation in a process pool.
+
+The cleaned rows are split into partitions, either one per input workbook
+or one per (workbook, program), and each worker process streams and reduces
+its partition to a Program x Date cube. Partial cubes hold only additive
+columns, so the result is their sum (:func:`campaign_aggregates.merge_cubes`)
+and matches a serial build. Duplicate rows are dropped within each
+workbook; across workbooks they are summed as given, so overlapping exports
+of the same account belong in incremental_refresh.py instead.
+
+Program partitions read only their own rows: workbooks are converted to the
+Parquet cache in the parent first, and each worker pushes its program down
+to Arrow as the set of campaign names that resolve to it.
+
+Inputs under ``PARALLEL_MIN_ROWS`` rows, a single partition or
+``workers=1`` run serially in-process, where the pool start-up would cost
+more than it saves.
+
+Usage:
+    python campaign_parallel.py export_a.xlsx export_b.xlsx --partition file --workers 8
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from campaign_aggregates import build_cube, merge_cubes
+from campaign_cleaning import CAMPAIGN_MAPPING, REPORT_COLUMNS, as_resolver, iter_campaign_batches
+from campaign_ingest import (CACHE_DIR, KEY_SHEET, WORKBOOK_PATH, cache_raw_sheet, distinct_campaign_names,
+                             load_sheet, raw_row_count)
+from campaign_resolver import CampaignResolver
+from report_tables import RESULTS_DIR, build_report_tables, save_report_tables
+
+PARTITION_BY_FILE = 'file'
+PARTITION_BY_PROGRAM = 'program'
+
+# Below this many raw rows the cube is built serially
+PARALLEL_MIN_ROWS = 200_000
+
+
+def _cube_partition(task):
+    # Worker entry point: (path, programs or None, resolver, objective, cache_dir) -> (cube, unmatched)
+    path, programs, resolver, objective, cache_dir = task
+    resolver.unmatched.clear()
+    cube = build_cube(iter_campaign_batches(path, campaign_mapping=resolver, columns=REPORT_COLUMNS,
+                                            objective=objective, programs=programs, cache_dir=cache_dir))
+    return cube, resolver.unmatched
+
+
+def plan_partitions(paths, partition=PARTITION_BY_PROGRAM, campaign_mapping=CAMPAIGN_MAPPING, cache_dir=CACHE_DIR):
+    """List the ``(path, programs)`` partitions; ``programs`` is None for whole files.
+
+    Program partitions are planned from the Parquet cache, so ``paths`` must
+    already be cached (:func:`campaign_ingest.cache_raw_sheet`).
+    """
+    if partition == PARTITION_BY_FILE:
+        return [(path, None) for path in paths]
+    if partition != PARTITION_BY_PROGRAM:
+        raise ValueError(f"Unknown partitioning {partition!r}")
+    resolver = as_resolver(campaign_mapping)
+    tasks = []
+    for path in paths:
+        programs = resolver.programs_for_campaigns(distinct_campaign_names(path, cache_dir))
+        tasks += [(path, [program]) for program in programs]
+    return tasks
+
+
+def build_cube_parallel(paths=(WORKBOOK_PATH,), partition=PARTITION_BY_PROGRAM, workers=None,
+                        campaign_mapping=CAMPAIGN_MAPPING, objective='Leads', min_rows=PARALLEL_MIN_ROWS,
+                        cache_dir=CACHE_DIR):
+    """Build the lead cube of ``paths`` with one worker process per partition.
+
+    ``workers`` defaults to the CPU count. Unmatched campaigns seen by the
+    workers are added to ``campaign_mapping`` when it is a CampaignResolver.
+    """
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    resolver = as_resolver(campaign_mapping)
+    workers = workers or os.cpu_count() or 1
+
+    # Convert every workbook once; planning, counting and the workers then read the cache
+    for path in paths:
+        cache_raw_sheet(path, cache_dir)
+    total_rows = sum(raw_row_count(path, cache_dir) for path in paths)
+    tasks = (plan_partitions(paths, partition, resolver, cache_dir)
+             if workers > 1 and total_rows >= min_rows else [])
+
+    if len(tasks) < 2:
+        # Serial: one streaming pass per file, no per-program rescans
+        return merge_cubes([build_cube(iter_campaign_batches(path, campaign_mapping=resolver, columns=REPORT_COLUMNS,
+                                                             objective=objective, cache_dir=cache_dir))
+                            for path in paths])
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        results = list(pool.map(_cube_partition, [(path, programs, resolver, objective, cache_dir)
+                                                  for path, programs in tasks]))
+    for _, unmatched in results:
+        resolver.unmatched.update(unmatched)
+    return merge_cubes([cube for cube, _ in results])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('exports', nargs='*', default=[WORKBOOK_PATH], help='Workbooks to aggregate')
+    parser.add_argument('--partition', choices=[PARTITION_BY_PROGRAM, PARTITION_BY_FILE],
+                        default=PARTITION_BY_PROGRAM)
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--min-rows', type=int, default=PARALLEL_MIN_ROWS,
+                        help='Run serially below this many raw rows')
+    parser.add_argument('--key-workbook', default=WORKBOOK_PATH,
+                        help="Workbook whose 'Campaign Name Key' sheet maps campaigns to programs")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    campaign_mapping = CAMPAIGN_MAPPING
+    if os.path.exists(args.key_workbook):
+        campaign_mapping = CampaignResolver.from_key_sheet(load_sheet(KEY_SHEET, args.key_workbook, args.cache_dir))
+
+    start = time.time()
+    cube = build_cube_parallel(args.exports, args.partition, args.workers, campaign_mapping,
+                               min_rows=args.min_rows, cache_dir=args.cache_dir)
+    save_report_tables(build_report_tables(cube), args.results_dir)
+    print(f"Aggregated {int(cube['Rows'].sum())} lead rows from {len(args.exports)} workbook(s) "
+          f"into {len(cube)} program-days in {time.time() - start:.2f}s; "
+          f"reports written to {args.results_dir}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Campaign name to program resolution.
+
+Campaigns follow the naming convention ``COLLEGE_<PROGRAM>_Conversions_WW_<MonYY>``
+(older flights use ``COLLEGE_WW_<PROGRAM>_Conversions_<MonYY>``). The resolver
+combines the exact names from the Campaign Name Key sheet with a table of
+compiled convention patterns: program codes are learned from the key sheet
+names, so a new flight such as ``COLLEGE_MSEM_Conversions_WW_Jan26`` resolves
+without a key sheet update.
+
+Resolution runs once per distinct campaign name; rows are then mapped through
+categorical codes with a single array lookup, so the cost per row does not
+involve any Python.
+"""
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Naming convention patterns, tried in order. Each must capture a 'code' group.
+CAMPAIGN_PATTERNS = [
+    re.compile(r'^COLLEGE_(?P<code>[A-Za-z]+)_Conversions_WW_(?P<flight>[A-Za-z]+\d{2})$'),
+    re.compile(r'^COLLEGE_WW_(?P<code>[A-Za-z]+)_Conversions_(?P<flight>[A-Za-z]+\d{2})$'),
+]
+
+
+class CampaignResolver:
+    """Resolve campaign names to program names.
+
+    Exact names take precedence over convention patterns. Names matching
+    neither keep their raw campaign name as the program (the historical
+    fallback) and are counted in :attr:`unmatched`.
+    """
+
+    def __init__(self, campaign_mapping, program_codes=None, patterns=CAMPAIGN_PATTERNS):
+        self.exact = dict(campaign_mapping)
+        self.patterns = list(patterns)
+        self.program_codes = self._learn_codes(self.exact)
+        if program_codes:
+            self.program_codes.update({code.upper(): program for code, program in program_codes.items()})
+        self.unmatched = Counter()
+
+    @classmethod
+    def from_key_sheet(cls, df_key, **kwargs):
+        """Build a resolver from the raw 'Campaign Name Key' sheet."""
+        key = df_key.iloc[1:, [1, 2]].dropna()
+        names = key.iloc[:, 0].astype(str).str.strip()
+        programs = key.iloc[:, 1].astype(str).str.strip()
+        return cls(dict(zip(names, programs)), **kwargs)
+
+    def _learn_codes(self, mapping):
+        names = pd.Series(list(mapping), dtype=object)
+        programs = pd.Series(list(mapping.values()), dtype=object)
+        codes = {}
+        for pattern in self.patterns:
+            extracted = names.str.extract(pattern)['code'].str.upper()
+            found = extracted.notna()
+            for code, program in zip(extracted[found], programs[found]):
+                codes.setdefault(code, program)
+        return codes
+
+    def _resolve_unique(self, names):
+        # names: Index of distinct campaign names. Returns an object array of
+        # programs with NaN where nothing matched.
+        names = pd.Series(np.asarray(names, dtype=object))
+        resolved = names.map(self.exact)
+        for pattern in self.patterns:
+            pending = resolved.isna()
+            if not pending.any():
+                break
+            codes = names[pending].str.extract(pattern)['code'].str.upper()
+            resolved[pending] = codes.map(self.program_codes)
+        return resolved.to_numpy(dtype=object)
+
+    def resolve(self, campaign_names):
+        """Return the program for each campaign name as a categorical Series."""
+        names = campaign_names.astype('category')
+        categories = names.cat.categories
+        codes = names.cat.codes.to_numpy()
+        valid = codes >= 0
+
+        per_category = self.resolve_names(categories, np.bincount(codes[valid], minlength=len(categories)))
+        program_categories, category_to_program = np.unique(per_category.astype(str), return_inverse=True)
+        program_codes = np.full(len(codes), -1, dtype=np.int32)
+        program_codes[valid] = category_to_program[codes[valid]]
+        return pd.Series(pd.Categorical.from_codes(program_codes, program_categories),
+                         index=campaign_names.index, name='Program')
+
+    def resolve_names(self, names, rows):
+        """Programs for distinct campaign ``names``, each seen on ``rows`` rows.
+
+        Unmatched names keep their own name as the program and their rows are
+        counted in :attr:`unmatched`. Returns an object array aligned with
+        ``names``.
+        """
+        per_name = self._resolve_unique(names)
+        matched = pd.notna(per_name)
+        rows = np.asarray(rows)
+        missed = ~matched & (rows > 0)
+        for name, count in zip(np.asarray(names, dtype=object)[missed], rows[missed]):
+            self.unmatched[name] += int(count)
+        return np.where(matched, per_name, np.asarray(names, dtype=object))
+
+    def _programs_per_name(self, campaign_names):
+        # Distinct names and their programs, unmatched names standing for
+        # themselves; nothing is counted in self.unmatched
+        names = pd.Index(pd.unique(np.asarray(campaign_names, dtype=object)))
+        per_name = self._resolve_unique(names)
+        return names, np.where(pd.notna(per_name), per_name, np.asarray(names, dtype=object))
+
+    def campaigns_for_programs(self, programs, campaign_names):
+        """The subset of ``campaign_names`` that resolves to any of ``programs``."""
+        names, per_name = self._programs_per_name(campaign_names)
+        return list(names[np.isin(per_name, list(programs))])
+
+    def programs_for_campaigns(self, campaign_names):
+        """The distinct programs ``campaign_names`` resolve to, sorted."""
+        return sorted(set(self._programs_per_name(campaign_names)[1]))
+
+    def unmatched_report(self):
+        """Unmatched campaign names seen so far, with their row counts."""
+        return pd.DataFrame(self.unmatched.most_common(), columns=['Campaign name', 'Rows'])
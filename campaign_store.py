@@ -0,0 +1,224 @@
+"""Backends for building the lead cube: pandas stream or an SQLite file.
+
+The pandas backend streams cleaned batches through :func:`build_cube`. The
+SQLite backend stores the cleaned rows in an SQLite file next to the Parquet
+cache (no server, standard library only) and runs the row-level aggregation
+as a single ``GROUP BY``, so history far larger than memory can be reduced
+to the cube without pandas ever holding it.
+
+The SQLite file is written from the same :func:`iter_campaign_batches`
+stream the pandas backend reads, so both produce the same Program x Date
+cube and every report table rolled up from it is the same whichever backend
+ran. Which rows that stream holds depends on the objective and on the
+deduplication and validation settings, so the file is kept per workbook
+version and per combination of those. It stores campaign names rather than
+programs: programs are resolved per query through a small temporary mapping
+table, so one file serves any campaign mapping. The deduplication and
+validation statistics of the rows stored are kept in the file too (as JSON),
+so a run that reuses it reports the same duplicates and violations as the
+run that wrote it.
+
+:func:`build_lead_cube` picks the backend from the workbook's row count.
+"""
+import hashlib
+import io
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from campaign_aggregates import CUBE_SUM_COLUMNS, _attach_date_attributes, build_cube
+from campaign_cleaning import CAMPAIGN_MAPPING, REPORT_COLUMNS, as_resolver, iter_campaign_batches
+from campaign_dedup import as_deduplicator
+from campaign_ingest import CACHE_DIR, WORKBOOK_PATH, raw_row_count, workbook_cache_dir
+from campaign_validation import MODE_REPORT, as_validator
+
+BACKEND_PANDAS = 'pandas'
+BACKEND_SQLITE = 'sqlite'
+BACKEND_AUTO = 'auto'
+
+# From this many raw rows 'auto' aggregates in SQLite
+SQLITE_MIN_ROWS = 5_000_000
+
+# lead_rows-<hash of the objective and check settings>.sqlite
+SQLITE_FILE = 'lead_rows-{}.sqlite'
+# Part of the hash; bumped when the stored rows or statistics change shape
+SQLITE_FORMAT = 2
+
+# Cleaned row column -> SQL column
+_SQL_COLUMNS = {
+    'Campaign name': 'campaign',
+    'Objective': 'objective',
+    'Amount spent (USD)': 'spend',
+    'Results': 'results',
+    'Link clicks': 'link_clicks',
+    'Landing page views': 'landing_page_views',
+    'Impressions': 'impressions',
+    'CPL': 'cpl',
+}
+
+_CREATE_TABLE = """
+CREATE TABLE lead_rows (
+    campaign TEXT NOT NULL,
+    objective TEXT,
+    day INTEGER NOT NULL,
+    spend REAL,
+    results INTEGER,
+    link_clicks INTEGER,
+    landing_page_views INTEGER,
+    impressions INTEGER,
+    cpl REAL
+)
+"""
+
+# Deduplicator / Validator statistics of the stored rows, as JSON per check
+_CREATE_STATS_TABLE = "CREATE TABLE ingest_stats (name TEXT PRIMARY KEY, stats TEXT NOT NULL)"
+
+_CUBE_QUERY = """
+SELECT m.program AS "Program", r.day AS day,
+       TOTAL(r.spend) AS "Amount spent (USD)",
+       TOTAL(r.results) AS "Results",
+       TOTAL(r.link_clicks) AS "Link clicks",
+       TOTAL(r.landing_page_views) AS "Landing page views",
+       TOTAL(r.impressions) AS "Impressions",
+       TOTAL(r.cpl) AS "CPL_sum",
+       COUNT(r.cpl) AS "CPL_count",
+       COUNT(*) AS "Rows"
+FROM lead_rows AS r JOIN temp.program_map AS m ON m.campaign = r.campaign
+{where}
+GROUP BY m.program, r.day
+ORDER BY m.program, r.day
+"""
+
+
+def sqlite_path(path=WORKBOOK_PATH, cache_dir=CACHE_DIR, objective='Leads', dedupe=True, validate=MODE_REPORT):
+    """SQLite file of ``path`` for the rows of ``objective`` read with these checks."""
+    deduplicator, validator = as_deduplicator(dedupe), as_validator(validate)
+    settings = [SQLITE_FORMAT, objective,
+                deduplicator.key if deduplicator is not None else None,
+                [validator.mode, validator.rules] if validator is not None else None]
+    tag = hashlib.sha1(repr(settings).encode()).hexdigest()[:16]
+    return os.path.join(workbook_cache_dir(path, cache_dir), SQLITE_FILE.format(tag))
+
+
+def _encode_stats(value):
+    # Validator samples are DataFrames; everything else is plain JSON
+    if isinstance(value, pd.DataFrame):
+        return {'__frame__': value.to_json(orient='table', date_format='iso')}
+    raise TypeError(f"Cannot store {type(value).__name__} in the SQLite stats")
+
+
+def _decode_stats(value):
+    if '__frame__' in value:
+        return pd.read_json(io.StringIO(value['__frame__']), orient='table')
+    return value
+
+
+def _stored_stats(db_path):
+    # {check name: stats} stored with the file; None for files written before
+    # the statistics were kept as JSON
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT name, stats FROM ingest_stats").fetchall()
+        return {name: json.loads(stats, object_hook=_decode_stats) for name, stats in rows}
+    except (sqlite3.OperationalError, TypeError, ValueError):
+        return None
+    finally:
+        conn.close()
+
+
+def load_sqlite(path=WORKBOOK_PATH, cache_dir=CACHE_DIR, objective='Leads', dedupe=True, validate=MODE_REPORT):
+    """Store the cleaned rows of ``path`` for ``objective`` in its SQLite file.
+
+    The file is written once per workbook version, objective and check
+    settings, from the same rows :func:`iter_campaign_batches` yields for
+    them. An existing file is reused as is, and a Deduplicator or Validator
+    passed then gets the statistics stored with it, so it reports what it
+    would have found. Quarantined rows are only written out (to the
+    Validator's ``quarantine_path``) when the file is built.
+    """
+    deduplicator, validator = as_deduplicator(dedupe), as_validator(validate)
+    db_path = sqlite_path(path, cache_dir, objective, deduplicator, validator)
+    stored = _stored_stats(db_path) if os.path.exists(db_path) else None
+    if stored is None:
+        stored = _write_sqlite(path, db_path, cache_dir, objective, deduplicator, validator)
+    for name, check in [('dedupe', deduplicator), ('validate', validator)]:
+        if check is not None and name in stored:
+            check.add_stats(stored[name])
+    return db_path
+
+
+def _write_sqlite(path, db_path, cache_dir, objective, deduplicator, validator):
+    # Checks run on fresh copies so the file stores this build's statistics only
+    checks = {name: check.fresh() for name, check in [('dedupe', deduplicator), ('validate', validator)]
+              if check is not None}
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    with sqlite3.connect(tmp_path) as conn:
+        conn.execute(_CREATE_TABLE)
+        batches = iter_campaign_batches(path, columns=REPORT_COLUMNS, objective=objective, cache_dir=cache_dir,
+                                        dedupe=checks.get('dedupe', False), validate=checks.get('validate'))
+        for batch in batches:
+            rows = batch[list(_SQL_COLUMNS)].rename(columns=_SQL_COLUMNS)
+            rows['campaign'] = rows['campaign'].astype(str)
+            rows['objective'] = rows['objective'].astype(object)
+            rows['day'] = batch['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+            rows.to_sql('lead_rows', conn, if_exists='append', index=False)
+        conn.execute("CREATE INDEX lead_rows_objective ON lead_rows (objective, campaign)")
+        conn.execute(_CREATE_STATS_TABLE)
+        stats = {name: check.stats() for name, check in checks.items()}
+        conn.executemany("INSERT INTO ingest_stats VALUES (?, ?)",
+                         [(name, json.dumps(value, default=_encode_stats)) for name, value in stats.items()])
+    conn.close()
+    os.replace(tmp_path, db_path)
+    return stats
+
+
+def build_cube_sqlite(path=WORKBOOK_PATH, campaign_mapping=CAMPAIGN_MAPPING, objective='Leads',
+                      cache_dir=CACHE_DIR, dedupe=True, validate=MODE_REPORT):
+    """The lead cube of ``path`` aggregated by SQLite from the stored cleaned rows."""
+    resolver = as_resolver(campaign_mapping)
+    conn = sqlite3.connect(load_sqlite(path, cache_dir, objective, dedupe, validate))
+    try:
+        where, params = ("WHERE r.objective = ?", [objective]) if objective is not None else ("", [])
+        counts = pd.read_sql_query(
+            f"SELECT r.campaign AS campaign, COUNT(*) AS n FROM lead_rows AS r {where} GROUP BY r.campaign",
+            conn, params=params)
+        programs = resolver.resolve_names(pd.Index(counts['campaign']), counts['n'].to_numpy())
+        conn.execute("CREATE TEMP TABLE program_map (campaign TEXT PRIMARY KEY, program TEXT NOT NULL)")
+        conn.executemany("INSERT INTO temp.program_map VALUES (?, ?)", zip(counts['campaign'], programs))
+        cube = pd.read_sql_query(_CUBE_QUERY.format(where=where), conn, params=params)
+    finally:
+        conn.close()
+
+    days = cube.pop('day').to_numpy().astype('datetime64[D]')
+    cube.insert(1, 'Date', pd.to_datetime(days.astype('datetime64[us]')))
+    # TOTAL() is always REAL; counts go back to integers like the pandas cube
+    for col in CUBE_SUM_COLUMNS:
+        if col != 'Amount spent (USD)':
+            cube[col] = cube[col].astype('int64')
+    return _attach_date_attributes(cube)
+
+
+def choose_backend(path=WORKBOOK_PATH, cache_dir=CACHE_DIR, min_rows=SQLITE_MIN_ROWS):
+    """``'sqlite'`` for workbooks of at least ``min_rows`` raw rows, else ``'pandas'``."""
+    return BACKEND_SQLITE if raw_row_count(path, cache_dir) >= min_rows else BACKEND_PANDAS
+
+
+def build_lead_cube(path=WORKBOOK_PATH, campaign_mapping=CAMPAIGN_MAPPING, objective='Leads',
+                    backend=BACKEND_AUTO, cache_dir=CACHE_DIR, dedupe=True, validate=MODE_REPORT):
+    """Build the Program x Date lead cube with the given or size-chosen backend."""
+    if backend == BACKEND_AUTO:
+        backend = choose_backend(path, cache_dir)
+    if backend == BACKEND_SQLITE:
+        return build_cube_sqlite(path, campaign_mapping, objective, cache_dir, dedupe, validate)
+    if backend != BACKEND_PANDAS:
+        raise ValueError(f"Unknown backend {backend!r}")
+    return build_cube(iter_campaign_batches(path, campaign_mapping=campaign_mapping, columns=REPORT_COLUMNS,
+                                            objective=objective, cache_dir=cache_dir, dedupe=dedupe,
+                                            validate=validate))
@@ -0,0 +1,127 @@
+"""Prefix-sum index over the lead cube for arbitrary date-range KPIs.
+
+For each program the additive cube columns are stored as a running total over
+consecutive days, with a leading zero row:
+
+    cumulative[p, d] = sum of program p's values on days [first_day, first_day + d)
+
+The total of any inclusive window [start, end] is then
+``cumulative[:, end + 1] - cumulative[:, start]``: two lookups per program,
+whatever the window length, and no rows are rescanned. Ratio KPIs (CPL,
+conversion rates, CTR) are computed from the windowed sums exactly as
+:func:`campaign_aggregates.rollup` does.
+
+Usage:
+    python campaign_time_index.py 2024-11-03 2024-12-12
+    python campaign_time_index.py --last-days 17 --total
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from campaign_aggregates import CPL_MEAN_DAILY, RATIO_METRICS, _additive_columns, ratio_metric
+
+
+def _day(value):
+    return pd.Timestamp(value).to_datetime64().astype('datetime64[D]')
+
+
+class PrefixSumIndex:
+    """Per-program daily cumulative sums of a Program x Date cube.
+
+    Days without rows contribute zero, so windows may start or end on any
+    date; dates outside the indexed span are clipped to it.
+    """
+
+    def __init__(self, cube, columns=None):
+        self.columns = list(columns) if columns is not None else _additive_columns(cube)
+        programs = cube['Program'].astype(str)
+        self.programs = pd.Index(sorted(programs.unique()), name='Program')
+
+        days = cube['Date'].to_numpy(dtype='datetime64[D]')
+        if len(days):
+            self.first_day, self.last_day = days.min(), days.max()
+        else:
+            self.first_day = self.last_day = np.datetime64('NaT', 'D')
+        n_days = int((self.last_day - self.first_day).astype(np.int64)) + 1 if len(days) else 0
+
+        cumulative = np.zeros((len(self.programs), n_days + 1, len(self.columns)))
+        rows = self.programs.get_indexer(programs)
+        offsets = (days - self.first_day).astype(np.int64) + 1
+        np.add.at(cumulative, (rows, offsets), cube[self.columns].to_numpy(dtype='float64'))
+        self.cumulative = np.cumsum(cumulative, axis=1, out=cumulative)
+
+    @property
+    def n_days(self):
+        return self.cumulative.shape[1] - 1
+
+    def _bounds(self, start, end):
+        lo = 0 if start is None else int((_day(start) - self.first_day).astype(np.int64))
+        hi = self.n_days if end is None else int((_day(end) - self.first_day).astype(np.int64)) + 1
+        lo = min(max(lo, 0), self.n_days)
+        hi = min(max(hi, lo), self.n_days)
+        return lo, hi
+
+    def _program_rows(self, programs):
+        if programs is None:
+            return slice(None), self.programs
+        programs = pd.Index([programs] if isinstance(programs, str) else list(programs), name='Program')
+        rows = self.programs.get_indexer(programs)
+        if (rows < 0).any():
+            raise KeyError(f"Programs not in index: {list(programs[rows < 0])}")
+        return rows, programs
+
+    def totals(self, start=None, end=None, programs=None, by_program=True):
+        """Summed columns for the inclusive window [start, end].
+
+        ``None`` bounds mean the first/last indexed day. Returns a DataFrame
+        indexed by Program, or a Series over all selected programs when
+        ``by_program`` is false.
+        """
+        lo, hi = self._bounds(start, end)
+        rows, labels = self._program_rows(programs)
+        window = self.cumulative[rows, hi] - self.cumulative[rows, lo]
+        sums = pd.DataFrame(window, index=labels, columns=self.columns)
+        return sums if by_program else sums.sum()
+
+    def kpis(self, start=None, end=None, programs=None, by_program=True,
+             metrics=tuple(RATIO_METRICS), cpl=CPL_MEAN_DAILY):
+        """Windowed sums plus ratio ``metrics`` (``RATIO_METRICS`` names) computed from them."""
+        sums = self.totals(start, end, programs)
+        if not by_program:
+            sums = sums.sum().to_frame('All').T
+        table = sums.copy()
+        for name in metrics:
+            table[name] = ratio_metric(sums, name, cpl=cpl)
+        return table if by_program else table.iloc[0]
+
+    def trailing_window(self, days, end=None):
+        """``(start, end)`` of the ``days``-day window ending on ``end`` (default: last indexed day)."""
+        end = self.last_day if end is None else _day(end)
+        return pd.Timestamp(end - np.timedelta64(days - 1, 'D')), pd.Timestamp(end)
+
+
+def main():
+    from campaign_aggregates import build_cube
+    from campaign_cleaning import REPORT_COLUMNS, iter_campaign_batches
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('start', nargs='?', help='First day of the window (default: first day in the data)')
+    parser.add_argument('end', nargs='?', help='Last day of the window, inclusive (default: last day)')
+    parser.add_argument('--last-days', type=int, help='Use the trailing N-day window instead of start/end')
+    parser.add_argument('--total', action='store_true', help='One row over all programs')
+    args = parser.parse_args()
+
+    index = PrefixSumIndex(build_cube(iter_campaign_batches(columns=REPORT_COLUMNS, objective='Leads')))
+    start, end = index.trailing_window(args.last_days) if args.last_days else (args.start, args.end)
+    lo, hi = index._bounds(start, end)
+    print(f"Window: {pd.Timestamp(index.first_day + lo).date()} to "
+          f"{pd.Timestamp(index.first_day + hi - 1).date()} ({hi - lo} days)")
+    table = index.kpis(start, end, by_program=not args.total)
+    columns = ['Amount spent (USD)', 'Results', 'Link clicks', 'Landing page views'] + list(RATIO_METRICS)
+    print(table[columns].round(2).to_string())
+
+
+if __name__ == '__main__':
+    main()
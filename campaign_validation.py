@@ -0,0 +1,337 @@
+"""Vectorized data-quality checks on raw rows during ingest.
+
+Each rule in ``VALIDATION_RULES`` is one comparison that marks the rows
+violating it, evaluated as a boolean array over a whole batch, so checking a
+batch costs a few array operations per rule. :class:`Validator` runs the
+rules on every batch as it streams past and keeps:
+
+- the number of rows violating each rule
+- a uniform random sample of offending rows per rule (each offending row gets
+  a random key and the ``sample_size`` smallest keys are kept, so sampling is
+  as cheap as the checks and independent of batch boundaries)
+
+What happens to offending rows depends on the mode: ``'report'`` keeps them,
+``'quarantine'`` drops them from the stream (optionally writing them to a
+Parquet file with the rules they broke) and ``'fail'`` raises
+:class:`DataQualityError` at the first batch holding one.
+
+A rule may name an exemption, rows it never applies to: the export writes the
+objective '0' on days a campaign did not deliver, so ``unknown_objective``
+exempts '0' rows with no spend, impressions, clicks or results, and flags any
+other '0' row.
+
+Usage:
+    python campaign_validation.py export.xlsx --mode quarantine --quarantine bad_rows.parquet
+"""
+import argparse
+import operator
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from campaign_ingest import WORKBOOK_PATH, iter_raw_batches
+
+MODE_REPORT = 'report'
+MODE_QUARANTINE = 'quarantine'
+MODE_FAIL = 'fail'
+MODES = (MODE_REPORT, MODE_QUARANTINE, MODE_FAIL)
+
+# Meta campaign objectives
+KNOWN_OBJECTIVES = ('Leads', 'Awareness', 'Traffic', 'Engagement', 'App promotion', 'Sales')
+
+# On days a campaign did not deliver the export writes '0' as the objective.
+# Such a row is a non-delivery row only when nothing was spent, shown, clicked
+# or won; a '0' row with any of these is an unknown objective like any other.
+NON_DELIVERY_OBJECTIVE = '0'
+NON_DELIVERY_COLUMNS = ['Amount spent (USD)', 'Impressions', 'Link clicks', 'Results']
+
+# (rule, column, operator, value[, exemption]): a row violates the rule when
+# the comparison holds. value is a constant, the name of another column, or
+# for 'not in' a collection of allowed values. Missing values never violate a
+# comparison; a missing value is not in any collection. Rows matching the
+# optional exemption (a key of EXEMPTIONS) never violate the rule.
+VALIDATION_RULES = [
+    ('negative_spend', 'Amount spent (USD)', '<', 0),
+    ('results_exceed_clicks', 'Results', '>', 'Link clicks'),
+    ('lpv_exceed_clicks', 'Landing page views', '>', 'Link clicks'),
+    ('end_before_start', 'Reporting ends', '<', 'Reporting starts'),
+    ('unknown_objective', 'Objective', 'not in', KNOWN_OBJECTIVES, 'non_delivery'),
+]
+
+DEFAULT_SAMPLE_SIZE = 5
+
+_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+class DataQualityError(ValueError):
+    """Raised in ``'fail'`` mode; :attr:`validator` holds the counts and samples so far."""
+
+    def __init__(self, message, validator):
+        super().__init__(message)
+        self.validator = validator
+
+
+def non_delivery_rows(batch):
+    """Mask of non-delivery rows: objective '0' and nothing in ``NON_DELIVERY_COLUMNS``."""
+    idle = batch['Objective'].astype(object).eq(NON_DELIVERY_OBJECTIVE).to_numpy(copy=True)
+    for col in NON_DELIVERY_COLUMNS:
+        idle &= batch[col].fillna(0).to_numpy() == 0
+    return idle
+
+
+# Exemption -> (columns it reads, row mask)
+EXEMPTIONS = {
+    'non_delivery': (['Objective'] + NON_DELIVERY_COLUMNS, non_delivery_rows),
+}
+
+
+def _rule_parts(rule):
+    # (name, column, op, value, exemption or None)
+    return tuple(rule) if len(rule) == 5 else (*rule, None)
+
+
+def rule_columns(rules=VALIDATION_RULES):
+    """Raw columns the rules read."""
+    columns = []
+    for _, column, op, value, exemption in map(_rule_parts, rules):
+        columns.append(column)
+        if op in _OPERATORS and isinstance(value, str):
+            columns.append(value)
+        if exemption is not None:
+            columns += EXEMPTIONS[exemption][0]
+    return list(dict.fromkeys(columns))
+
+
+def _rule_mask(batch, column, op, value, exemption=None):
+    if op == 'not in':
+        mask = ~batch[column].isin(value).to_numpy()
+    elif op in _OPERATORS:
+        left = batch[column].to_numpy()
+        right = batch[value].to_numpy() if isinstance(value, str) else value
+        mask = _OPERATORS[op](left, right)
+    else:
+        raise ValueError(f"Unknown validation operator {op!r}")
+    if exemption is not None and mask.any():
+        mask &= ~EXEMPTIONS[exemption][1](batch)
+    return mask
+
+
+class Validator:
+    """Apply ``rules`` to a stream of raw batches in the given ``mode``.
+
+    Counts and samples add up over every stream validated, like the
+    resolver's unmatched counts.
+    """
+
+    def __init__(self, mode=MODE_REPORT, rules=VALIDATION_RULES, sample_size=DEFAULT_SAMPLE_SIZE,
+                 quarantine_path=None, seed=0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown validation mode {mode!r}; expected one of {MODES}")
+        self.mode = mode
+        self.rules = [_rule_parts(rule) for rule in rules]
+        self.columns = rule_columns(self.rules)
+        self.sample_size = sample_size
+        self.quarantine_path = quarantine_path
+        self.rows = 0
+        self.quarantined = 0
+        self.violations = Counter()
+        # Rows checked by audit() are counted apart: they were checked against
+        # fewer rules, so they stay out of the shares of the rows read
+        self.audited_rows = 0
+        self.audited_rules = []
+        self.audit_violations = Counter()
+        self._samples = {}
+        self._rng = np.random.default_rng(seed)
+
+    def check(self, batch, rules=None, audit=False):
+        """Count one batch's violations of ``rules`` (default: all); returns the mask of offending rows.
+
+        With ``audit`` the rows and violations go to the audit counts.
+        """
+        if audit:
+            self.audited_rows += len(batch)
+        else:
+            self.rows += len(batch)
+        violations = self.audit_violations if audit else self.violations
+        offending = np.zeros(len(batch), dtype=bool)
+        for name, column, op, value, exemption in (self.rules if rules is None else rules):
+            mask = _rule_mask(batch, column, op, value, exemption)
+            count = int(np.count_nonzero(mask))
+            if not count:
+                continue
+            violations[name] += count
+            offending |= mask
+            self._sample(name, batch, np.flatnonzero(mask))
+        return offending
+
+    def _sample(self, name, batch, rows):
+        # Keep the rows with the smallest random keys, new and kept alike
+        keys = self._rng.random(len(rows))
+        if len(rows) > self.sample_size:
+            smallest = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            rows, keys = rows[smallest], keys[smallest]
+        self._keep_sample(name, batch.iloc[rows].assign(_key=keys))
+
+    def _keep_sample(self, name, candidates):
+        if name in self._samples:
+            candidates = pd.concat([self._samples[name], candidates], ignore_index=True)
+        self._samples[name] = candidates.nsmallest(self.sample_size, '_key')
+
+    def _failed_rules(self, rows):
+        labels = np.full(len(rows), '', dtype=object)
+        for name, column, op, value, exemption in self.rules:
+            labels = np.where(_rule_mask(rows, column, op, value, exemption), labels + name + ';', labels)
+        return pd.Series(labels, index=rows.index).str.rstrip(';')
+
+    def rules_on(self, column):
+        """The rules that read ``column``."""
+        return [rule for rule in self.rules if column in rule_columns([rule])]
+
+    def validate(self, batches):
+        """Yield ``batches`` with offending rows kept, dropped or raised on, per the mode."""
+        writer = None
+        try:
+            for batch in batches:
+                offending = self.check(batch)
+                if not offending.any():
+                    yield batch
+                    continue
+                if self.mode == MODE_FAIL:
+                    raise DataQualityError(f"Data-quality rules violated: {self.summary()}", self)
+                if self.mode == MODE_REPORT:
+                    yield batch
+                    continue
+                self.quarantined += int(np.count_nonzero(offending))
+                if self.quarantine_path:
+                    rows = batch[offending]
+                    table = pa.Table.from_pandas(rows.assign(Failed_Rules=self._failed_rules(rows)),
+                                                 preserve_index=False)
+                    if writer is None:
+                        os.makedirs(os.path.dirname(os.path.abspath(self.quarantine_path)), exist_ok=True)
+                        writer = pq.ParquetWriter(self.quarantine_path, table.schema)
+                    writer.write_table(table.cast(writer.schema))
+                if not offending.all():
+                    yield batch[~offending]
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def audit(self, batches, rules=None):
+        """Check rows a read leaves out anyway against ``rules`` (default: all).
+
+        Rows and violations are counted apart from the rows read (see
+        :meth:`report`) and sampled with them, and 'fail' raises on them, but
+        as the rows are not passed on there is nothing to quarantine.
+        """
+        rules = self.rules if rules is None else rules
+        self.audited_rules = list(dict.fromkeys(self.audited_rules + [rule[0] for rule in rules]))
+        for batch in batches:
+            if self.check(batch, rules, audit=True).any() and self.mode == MODE_FAIL:
+                raise DataQualityError(f"Data-quality rules violated: {self.summary()}", self)
+
+    def fresh(self):
+        """A Validator with the same settings and no counts or samples."""
+        return Validator(self.mode, self.rules, self.sample_size, self.quarantine_path)
+
+    def stats(self):
+        """Counts and samples so far; see :meth:`add_stats`."""
+        return {'rows': self.rows, 'quarantined': self.quarantined, 'violations': dict(self.violations),
+                'audited_rows': self.audited_rows, 'audited_rules': list(self.audited_rules),
+                'audit_violations': dict(self.audit_violations), 'samples': dict(self._samples)}
+
+    def add_stats(self, stats):
+        """Add counts and samples from :meth:`stats`; samples stay a uniform sample of both."""
+        self.rows += stats['rows']
+        self.quarantined += stats['quarantined']
+        self.violations.update(stats['violations'])
+        self.audited_rows += stats.get('audited_rows', 0)
+        self.audited_rules = list(dict.fromkeys(self.audited_rules + stats.get('audited_rules', [])))
+        self.audit_violations.update(stats.get('audit_violations', {}))
+        for name, sample in stats['samples'].items():
+            self._keep_sample(name, sample)
+
+    @property
+    def found(self):
+        """Whether any rule was violated, in the rows read or the audited ones."""
+        return bool(self.violations or self.audit_violations)
+
+    def summary(self):
+        summary = ', '.join(f"{name} ({count})" for name, count in self.violations.most_common())
+        if self.audit_violations:
+            audited = ', '.join(f"{name} ({count})" for name, count in self.audit_violations.most_common())
+            summary = '; '.join(filter(None, [summary, f"outside the filter: {audited}"]))
+        return summary
+
+    def report(self):
+        """Violations per rule, in rule order.
+
+        Share is over the rows read. When rows outside a filter were audited,
+        Outside_Filter and Outside_Share give the audited rules' violations
+        among them (NaN for rules not audited).
+        """
+        rows = []
+        for name, column, op, value, exemption in self.rules:
+            row = {
+                'Rule': name,
+                'Check': (f"{column} {op} {value if not isinstance(value, (tuple, list, set)) else sorted(value)}"
+                          + (f" unless {exemption}" if exemption else '')),
+                'Violations': self.violations[name],
+                'Share': self.violations[name] / self.rows if self.rows else np.nan,
+            }
+            if self.audited_rows:
+                audited = name in self.audited_rules
+                row['Outside_Filter'] = self.audit_violations[name] if audited else np.nan
+                row['Outside_Share'] = self.audit_violations[name] / self.audited_rows if audited else np.nan
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def samples(self, rule):
+        """Sampled offending rows of ``rule`` (empty when it was never violated)."""
+        sample = self._samples.get(rule)
+        if sample is None:
+            return pd.DataFrame()
+        return sample.sort_values('_key').drop(columns='_key').reset_index(drop=True)
+
+
+def as_validator(validate):
+    """A Validator for a mode name, the given one, or None for ``None``/``False``."""
+    if isinstance(validate, Validator):
+        return validate
+    return Validator(validate) if validate else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('workbook', nargs='?', default=WORKBOOK_PATH)
+    parser.add_argument('--mode', choices=MODES, default=MODE_REPORT)
+    parser.add_argument('--quarantine', default=None, help='Parquet file for quarantined rows')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLE_SIZE, help='Sampled rows per rule')
+    args = parser.parse_args()
+
+    validator = Validator(args.mode, sample_size=args.samples, quarantine_path=args.quarantine)
+    try:
+        kept = sum(len(batch) for batch in validator.validate(iter_raw_batches(args.workbook)))
+    except DataQualityError as exc:
+        print(f"FAILED: {exc}")
+        kept = None
+    print(validator.report().to_string(index=False))
+    for name, count in validator.violations.most_common():
+        print(f"\n{name}: {count} rows, sample:")
+        print(validator.samples(name).to_string(index=False))
+    if kept is not None:
+        print(f"\n{validator.rows} rows checked, {kept} passed on, {validator.quarantined} quarantined")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Where the report charts are written, without importing any plotting library.
+
+A chart job is written in one or more output profiles (``OUTPUT_PROFILES``),
+each setting the file format, DPI, figure size and rasterization of dense
+artists: 'print' is the 300 DPI PNG at the job's path that the reports link
+to, 'deck' a lighter PNG in ``charts/deck/`` for the PowerPoint decks, 'web'
+an SVG and 'web-thumbnail' a small WebP. Every profile but 'print' writes to
+a subdirectory named after it.
+
+The drawing itself lives in report_charts.py, which imports matplotlib and
+seaborn. The report scripts only describe their chart jobs, hand them to the
+chart server and print the result, and the slide builders only need to know
+where a chart is, so they import this module instead; report_charts is
+imported only where a chart is actually rendered.
+"""
+import os
+
+CHARTS_DIR = 'charts'
+
+# Output profile -> file format, DPI, figure size scale and whether dense
+# artists are rasterized. 'print' is the reference rendering, written to the
+# job's own path; every other profile writes to a subdirectory named after it.
+OUTPUT_PROFILES = {
+    'print': {'format': 'png', 'dpi': 300, 'scale': 1.0, 'rasterize': False},
+    'deck': {'format': 'png', 'dpi': 150, 'scale': 0.75, 'rasterize': False},
+    'web': {'format': 'svg', 'dpi': 100, 'scale': 1.0, 'rasterize': True},
+    'web-thumbnail': {'format': 'webp', 'dpi': 72, 'scale': 0.5, 'rasterize': True},
+}
+DEFAULT_PROFILE = 'print'
+
+# Profiles the report scripts write: print for the written reports, deck for
+# the PowerPoint decks
+REPORT_PROFILES = ('print', 'deck')
+
+
+def output_profile(profile):
+    """Settings of the named output profile."""
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile {profile!r}; expected one of {tuple(OUTPUT_PROFILES)}")
+    return OUTPUT_PROFILES[profile]
+
+
+def profile_path(path, profile=DEFAULT_PROFILE):
+    """Where ``profile`` writes the chart whose print rendering goes to ``path``.
+
+    ``charts/01_x.png`` is ``charts/deck/01_x.png`` in the deck profile and
+    ``charts/web-thumbnail/01_x.webp`` in the web-thumbnail profile.
+    """
+    if profile == DEFAULT_PROFILE:
+        return path
+    directory, name = os.path.split(path)
+    return os.path.join(directory, profile, f"{os.path.splitext(name)[0]}.{output_profile(profile)['format']}")
+
+
+def chart_asset(path, profile):
+    """``path`` in ``profile`` if that rendering exists, else the print rendering."""
+    candidate = profile_path(path, profile)
+    return candidate if os.path.exists(candidate) else path
+
+
+def descriptive_chart_jobs(tables, thresholds, charts_dir=CHARTS_DIR):
+    """Jobs for charts 01-06 from :func:`report_tables.build_report_tables` output."""
+    path = lambda name: os.path.join(charts_dir, name)  # noqa: E731
+    return [
+        ('seasonality', path('01_seasonality_analysis.png'), {'monthly_stats': tables['monthly_stats']}),
+        ('conversion_rate', path('02_click_to_submit_rate.png'), {
+            'rates': tables['program_click_rates'],
+            'title': 'Click-to-Submit Conversion Rate by Program', 'color': 'steelblue'}),
+        ('conversion_rate', path('03_lpv_to_submit_rate.png'), {
+            'rates': tables['program_lpv_rates'],
+            'title': 'Landing Page View-to-Submit Conversion Rate by Program', 'color': 'green'}),
+        ('underperforming', path('04_underperforming_programs.png'), {
+            'program_performance': tables['program_performance'],
+            'cpl_median': thresholds['cpl_median'], 'conversion_median': thresholds['conversion_median']}),
+        ('engagement_trends', path('05_engagement_trends.png'), {'monthly_trends': tables['monthly_trends']}),
+        ('budget_allocation', path('06_budget_allocation.png'), {'program_roi': tables['program_roi']}),
+    ]
+
+
+def chart_cache_summary(results):
+    """One-line hit/miss summary of :func:`report_charts.render_charts` results."""
+    hits = int((results['Status'] == 'cached').sum())
+    copies = int((results['Status'] == 'copied').sum())
+    summary = (f"Charts: {len(results)} total, {hits} reused from the chart cache, "
+               f"{len(results) - hits - copies} rendered")
+    return summary + (f", {copies} copied from an identical chart" if copies else '')
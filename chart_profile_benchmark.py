@@ -0,0 +1,72 @@
+"""Render time and file size of the report charts per output profile.
+
+Builds the report tables of a workbook, then renders charts 01-06 once per
+output profile into a temporary directory, serially and without the chart
+store, so every chart is drawn each time. Reports per profile the render
+time (best of ``--repeat`` runs) and the size of the files written, against
+the print profile.
+
+Usage:
+    python chart_profile_benchmark.py --repeat 3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import matplotlib
+import pandas as pd
+
+from campaign_ingest import WORKBOOK_PATH
+from campaign_store import build_lead_cube
+from report_charts import OUTPUT_PROFILES, descriptive_chart_jobs, render_charts
+from report_tables import build_report_tables, categorization_thresholds
+
+DEFAULT_REPEAT = 3
+
+
+def benchmark_profile(jobs, profile, repeat):
+    """Render ``jobs`` in ``profile`` ``repeat`` times; returns the report row."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = render_charts(jobs, workers=1, cache_dir=None, profiles=(profile,))
+        seconds.append(time.perf_counter() - start)
+    size = sum(os.path.getsize(path) for path in results['Path'])
+    settings = OUTPUT_PROFILES[profile]
+    return {
+        'Profile': profile,
+        'Format': settings['format'],
+        'DPI': settings['dpi'],
+        'Scale': settings['scale'],
+        'Charts': len(results),
+        'Seconds': min(seconds),
+        'Ms_per_Chart': min(seconds) / len(results) * 1000,
+        'Total_KB': size / 1024,
+        'KB_per_Chart': size / 1024 / len(results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('workbook', nargs='?', default=WORKBOOK_PATH)
+    parser.add_argument('--profiles', nargs='+', choices=list(OUTPUT_PROFILES), default=list(OUTPUT_PROFILES))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Runs per profile; the best is kept')
+    args = parser.parse_args()
+
+    matplotlib.use('Agg')
+    tables = build_report_tables(build_lead_cube(args.workbook))
+    thresholds = categorization_thresholds(tables['program_performance'])
+    with tempfile.TemporaryDirectory(prefix='chart-profiles-') as charts_dir:
+        jobs = descriptive_chart_jobs(tables, thresholds, charts_dir)
+        report = pd.DataFrame([benchmark_profile(jobs, profile, args.repeat) for profile in args.profiles])
+
+    if 'print' in args.profiles:
+        reference = report.set_index('Profile').loc['print']
+        report['Time_vs_Print'] = report['Seconds'] / reference['Seconds']
+        report['Size_vs_Print'] = report['Total_KB'] / reference['Total_KB']
+    print(report.round(2).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""Long-lived local chart renderer that keeps matplotlib warm.
+
+A cold run pays for importing matplotlib and seaborn (seconds, most of it
+seaborn's scipy imports), the style setup and the first figure's font and
+backend loading before it draws anything, even to regenerate one chart. The
+chart server pays that once: it imports :mod:`report_charts`, applies the
+chart style, draws a warm-up figure and then serves render requests over a
+local socket until stopped.
+
+A request is a list of ``(chart name, path, inputs)`` jobs plus
+:func:`report_charts.render_charts` options; the server runs
+``render_charts`` in the caller's working directory, so relative chart paths
+and the chart store resolve as they would in the caller, and sends back its
+results table. :func:`request_charts` is the client; when no server is
+running it renders in-process instead, so callers work either way.
+
+The socket listens on localhost only, and connections authenticate with a
+random key the server writes to ``.cache/chart_server.key`` (readable only
+by its user) on start; requests are pickled, so only processes that can
+read the key may send them. The port it listens on (``--port``, 0 for any
+free one) is written next to the key, in ``chart_server.port``, where
+clients look it up.
+
+Usage:
+    python chart_server.py serve --port 0 &
+    python chart_server.py latency   # cold script run vs. server, one chart
+    python chart_server.py stop
+"""
+import argparse
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from campaign_ingest import CACHE_DIR
+
+CHART_SERVER_ADDRESS = ('127.0.0.1', 47821)
+CHART_SERVER_KEY = os.path.join(CACHE_DIR, 'chart_server.key')
+
+DEFAULT_LATENCY_RUNS = 5
+
+
+class ChartServerError(RuntimeError):
+    """A render request failed in the chart server."""
+
+
+# Failures of a connection rather than of a request: no key file, nothing
+# listening, a key that does not match, a reset or closed connection
+_UNREACHABLE = (OSError, EOFError, AuthenticationError)
+
+
+def _write_key(key_path):
+    key = os.urandom(32)
+    os.makedirs(os.path.dirname(key_path) or '.', exist_ok=True)
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(key)
+    return key
+
+
+def _read_key(key_path):
+    with open(key_path, 'rb') as fh:
+        return fh.read()
+
+
+def _port_path(key_path):
+    return os.path.splitext(key_path)[0] + '.port'
+
+
+def server_address(key_path=CHART_SERVER_KEY):
+    """Address of the server using ``key_path``: the port it wrote next to the key, else the default."""
+    try:
+        with open(_port_path(key_path)) as fh:
+            return CHART_SERVER_ADDRESS[0], int(fh.read())
+    except (OSError, ValueError):
+        return CHART_SERVER_ADDRESS
+
+
+def _warm_up(report_charts):
+    # Load the Agg canvas, fonts and text layout once, before the first request
+    import io
+
+    import matplotlib.pyplot as plt
+
+    report_charts.apply_chart_style()
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [0, 1], marker='o')
+    ax.set_title('warm-up', fontweight='bold')
+    fig.tight_layout()
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+
+def _handle(request, report_charts):
+    op = request.get('op')
+    if op == 'ping':
+        return {'ok': True, 'pid': os.getpid()}
+    if op != 'render':
+        return {'ok': False, 'error': f"Unknown request {op!r}"}
+    cwd = os.getcwd()
+    try:
+        os.chdir(request['cwd'])
+        return {'ok': True, 'results': report_charts.render_charts(request['jobs'], **request['options'])}
+    except Exception as exc:
+        return {'ok': False, 'error': f"{type(exc).__name__}: {exc}"}
+    finally:
+        os.chdir(cwd)
+
+
+def serve(address=CHART_SERVER_ADDRESS, key_path=CHART_SERVER_KEY):
+    """Serve render requests until a ``stop`` request arrives.
+
+    Port 0 listens on any free port; the port taken is written next to the key.
+    """
+    # Imported here so that clients importing this module stay light
+    import matplotlib
+    matplotlib.use('Agg')
+    import report_charts
+
+    key_path = os.path.abspath(key_path)
+    port_path = _port_path(key_path)
+    _warm_up(report_charts)
+    with Listener(address, authkey=_write_key(key_path)) as listener:
+        address = listener.address
+        with open(f"{port_path}.tmp", 'w') as fh:
+            fh.write(str(address[1]))
+        os.replace(f"{port_path}.tmp", port_path)
+        print(f"Chart server {os.getpid()} listening on {address[0]}:{address[1]}", flush=True)
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except _UNREACHABLE as exc:
+                    # A client that failed authentication or hung up early
+                    print(f"Rejected connection: {type(exc).__name__}: {exc}", flush=True)
+                    continue
+                with conn:
+                    try:
+                        request = conn.recv()
+                    except EOFError:
+                        continue
+                    if request.get('op') == 'stop':
+                        conn.send({'ok': True})
+                        break
+                    conn.send(_handle(request, report_charts))
+        finally:
+            for path in (key_path, port_path):
+                if os.path.exists(path):
+                    os.remove(path)
+    print("Chart server stopped", flush=True)
+
+
+def _request(request, address=None, key_path=CHART_SERVER_KEY):
+    with Client(address or server_address(key_path), authkey=_read_key(key_path)) as conn:
+        conn.send(request)
+        reply = conn.recv()
+    if not reply['ok']:
+        raise ChartServerError(reply['error'])
+    return reply
+
+
+def server_running(address=None, key_path=CHART_SERVER_KEY):
+    """Whether a chart server answers at ``address`` (default: :func:`server_address`)."""
+    try:
+        _request({'op': 'ping'}, address, key_path)
+    except _UNREACHABLE:
+        return False
+    return True
+
+
+def request_charts(jobs, address=None, key_path=CHART_SERVER_KEY, fallback=True, **options):
+    """:func:`report_charts.render_charts` of ``jobs``, in the chart server when one is running.
+
+    ``options`` are passed on to ``render_charts``. ``address`` defaults to
+    :func:`server_address`. When the server cannot be reached (no key file,
+    nothing listening, a stale key, a dropped connection) the charts render
+    in this process, unless ``fallback`` is false; a request the server
+    fails raises :class:`ChartServerError`.
+    """
+    request = {'op': 'render', 'cwd': os.getcwd(), 'jobs': list(jobs), 'options': options}
+    try:
+        return _request(request, address, key_path)['results']
+    except _UNREACHABLE:
+        if not fallback:
+            raise
+    from report_charts import render_charts
+    return render_charts(request['jobs'], **options)
+
+
+def _latency_job(charts_dir):
+    from campaign_store import build_lead_cube
+    from chart_outputs import descriptive_chart_jobs
+    from report_tables import build_report_tables, categorization_thresholds
+
+    tables = build_report_tables(build_lead_cube())
+    return descriptive_chart_jobs(tables, categorization_thresholds(tables['program_performance']), charts_dir)[0]
+
+
+def latency(runs=DEFAULT_LATENCY_RUNS, address=None, key_path=CHART_SERVER_KEY):
+    """Seconds to render one chart in a cold process and through the server, ``runs`` times each."""
+    with tempfile.TemporaryDirectory(prefix='chart-server-') as charts_dir:
+        job = _latency_job(charts_dir)
+        job_path = os.path.join(charts_dir, 'job.pkl')
+        with open(job_path, 'wb') as fh:
+            pickle.dump(job, fh)
+
+        cold, warm = [], []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, __file__, 'render', job_path], check=True)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            request_charts([job], address, key_path, fallback=False, cache_dir=None)
+            warm.append(time.perf_counter() - start)
+    return statistics.median(cold), statistics.median(warm)
+
+
+def _render_file(job_path):
+    # What a cold script does to redraw one chart
+    import matplotlib
+    matplotlib.use('Agg')
+    from report_charts import render_charts
+
+    with open(job_path, 'rb') as fh:
+        render_charts([pickle.load(fh)], cache_dir=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('command', choices=['serve', 'ping', 'stop', 'latency', 'render'])
+    parser.add_argument('job', nargs='?', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=None,
+                        help=f"serve: port to listen on, 0 for any free one (default {CHART_SERVER_ADDRESS[1]}); "
+                             "otherwise: port to connect to (default: the one the server wrote)")
+    parser.add_argument('--runs', type=int, default=DEFAULT_LATENCY_RUNS, help='Renders timed per mode')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(CHART_SERVER_ADDRESS if args.port is None else (CHART_SERVER_ADDRESS[0], args.port))
+        return
+    address = server_address() if args.port is None else (CHART_SERVER_ADDRESS[0], args.port)
+    if args.command == 'render':
+        _render_file(args.job)
+    elif args.command == 'ping':
+        print(f"Chart server running at {address[0]}:{address[1]}" if server_running(address)
+              else "No chart server running")
+    elif args.command == 'stop':
+        if not server_running(address):
+            print("No chart server running")
+            return
+        _request({'op': 'stop'}, address)
+        print("Chart server stopped")
+    else:
+        if not server_running(address):
+            sys.exit("No chart server running; start one with: python chart_server.py serve")
+        cold, warm = latency(args.runs, address)
+        print(f"One chart, median of {args.runs}: cold script run {cold:.2f}s, chart server {warm:.2f}s "
+              f"({cold / warm:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,8 @@ from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 import os
 
+from chart_outputs import chart_asset
+
 # Load analysis results
 monthly_stats = pd.read_csv('analysis_results/monthly_stats.csv')
 program_click_rates = pd.read_csv('analysis_results/program_click_rates.csv')
@@ -153,7 +155,7 @@ p.font.italic = True
 
 # Add chart image if exists
 if os.path.exists('charts/01_seasonality_analysis.png'):
-    slide.shapes.add_picture('charts/01_seasonality_analysis.png', Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
+    slide.shapes.add_picture(chart_asset('charts/01_seasonality_analysis.png', 'deck'), Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
 
 # ============================================================================
 # QUESTION 2: CLICK TO SUBMIT RATE
@@ -198,7 +200,7 @@ for idx, row in top_programs.iterrows():
         p.font.size = Pt(12)
 
 if os.path.exists('charts/02_click_to_submit_rate.png'):
-    slide.shapes.add_picture('charts/02_click_to_submit_rate.png', Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
+    slide.shapes.add_picture(chart_asset('charts/02_click_to_submit_rate.png', 'deck'), Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
 
 # ============================================================================
 # QUESTION 3: LPV TO SUBMIT RATE
@@ -235,7 +237,7 @@ p.font.size = Pt(14)
 p.font.italic = True
 
 if os.path.exists('charts/03_lpv_to_submit_rate.png'):
-    slide.shapes.add_picture('charts/03_lpv_to_submit_rate.png', Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
+    slide.shapes.add_picture(chart_asset('charts/03_lpv_to_submit_rate.png', 'deck'), Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
 
 # ============================================================================
 # QUESTION 4: UNDERPERFORMING PROGRAMS
@@ -272,7 +274,7 @@ p.font.size = Pt(14)
 p.font.italic = True
 
 if os.path.exists('charts/04_underperforming_programs.png'):
-    slide.shapes.add_picture('charts/04_underperforming_programs.png', Inches(0.5), Inches(4), Inches(9), Inches(3))
+    slide.shapes.add_picture(chart_asset('charts/04_underperforming_programs.png', 'deck'), Inches(0.5), Inches(4), Inches(9), Inches(3))
 
 # ============================================================================
 # QUESTION 5: TRENDS ANALYSIS
@@ -310,7 +312,7 @@ p.font.size = Pt(14)
 p.font.italic = True
 
 if os.path.exists('charts/05_engagement_trends.png'):
-    slide.shapes.add_picture('charts/05_engagement_trends.png', Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
+    slide.shapes.add_picture(chart_asset('charts/05_engagement_trends.png', 'deck'), Inches(0.5), Inches(3.5), Inches(9), Inches(3.5))
 
 # ============================================================================
 # QUESTION 6: BUDGET ALLOCATION RECOMMENDATIONS
@@ -357,7 +359,7 @@ for idx, row in underperformers.iterrows():
     p.font.size = Pt(12)
 
 if os.path.exists('charts/06_budget_allocation.png'):
-    slide.shapes.add_picture('charts/06_budget_allocation.png', Inches(0.5), Inches(4.5), Inches(9), Inches(2.5))
+    slide.shapes.add_picture(chart_asset('charts/06_budget_allocation.png', 'deck'), Inches(0.5), Inches(4.5), Inches(9), Inches(2.5))
 
 # ============================================================================
 # QUESTION 7: FY2025 RECOMMENDATIONS
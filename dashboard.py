@@ -4,6 +4,7 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -72,44 +73,46 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load data
+RESULTS_DIR = 'analysis_results'
+
+# Page -> the analysis_results/ tables it renders. Each table is read the
+# first time a page that needs it is opened, so start-up and memory follow
+# the pages viewed rather than the whole results folder.
+PAGE_DATASETS = {
+    "🏠 Executive Dashboard": ['program_performance', 'program_click_rates', 'monthly_stats'],
+    "📈 Seasonality Analysis": ['monthly_stats'],
+    "🎯 Conversion Rates": ['program_click_rates', 'program_lpv_rates', 'program_performance'],
+    "💼 Program Performance": ['program_performance'],
+    "🔮 Predictive Insights": ['what_if_scenarios', 'roi_optimization'],
+    "💡 Recommendations": ['program_performance'],
+}
+
+# Written by predictive_prescriptive_analysis.py, which may not have run yet
+OPTIONAL_DATASETS = {'what_if_scenarios', 'roi_optimization'}
+
+
 @st.cache_data
-def load_data():
-    monthly_stats = pd.read_csv('analysis_results/monthly_stats.csv')
-    program_performance = pd.read_csv('analysis_results/program_performance.csv')
-    program_click_rates = pd.read_csv('analysis_results/program_click_rates.csv')
-    program_lpv_rates = pd.read_csv('analysis_results/program_lpv_rates.csv')
-    program_roi = pd.read_csv('analysis_results/program_roi.csv')
-    monthly_trends = pd.read_csv('analysis_results/monthly_trends.csv')
-    
-    # Try to load predictive data if available
-    try:
-        what_if = pd.read_csv('analysis_results/what_if_scenarios.csv')
-        roi_optimization = pd.read_csv('analysis_results/roi_optimization.csv')
-    except:
-        what_if = None
-        roi_optimization = None
-    
-    return {
-        'monthly_stats': monthly_stats,
-        'program_performance': program_performance,
-        'program_click_rates': program_click_rates,
-        'program_lpv_rates': program_lpv_rates,
-        'program_roi': program_roi,
-        'monthly_trends': monthly_trends,
-        'what_if': what_if,
-        'roi_optimization': roi_optimization
-    }
+def load_dataset(name):
+    """One results table, cached per table; None for a missing optional table."""
+    path = os.path.join(RESULTS_DIR, f'{name}.csv')
+    if name in OPTIONAL_DATASETS and not os.path.exists(path):
+        return None
+    return pd.read_csv(path)
+
+
+def load_page_data(page):
+    return {name: load_dataset(name) for name in PAGE_DATASETS[page]}
 
-data = load_data()
 
 # Sidebar navigation
 st.sidebar.title("📊 Navigation")
 page = st.sidebar.radio(
     "Select Page",
-    ["🏠 Executive Dashboard", "📈 Seasonality Analysis", "🎯 Conversion Rates", 
-     "💼 Program Performance", "🔮 Predictive Insights", "💡 Recommendations"]
+    list(PAGE_DATASETS)
 )
 
+data = load_page_data(page)
+
 # ============================================================================
 # EXECUTIVE DASHBOARD
 # ============================================================================
@@ -589,7 +592,7 @@ elif page == "🔮 Predictive Insights":
     st.markdown('<h1 class="main-header">Predictive & Prescriptive Analysis</h1>', unsafe_allow_html=True)
     st.markdown('<p class="sub-header">Forecasts and Optimization Recommendations for FY2025</p>', unsafe_allow_html=True)
     
-    if data['what_if'] is not None and data['roi_optimization'] is not None:
+    if data['what_if_scenarios'] is not None and data['roi_optimization'] is not None:
         # What-if scenarios
         st.subheader("🎯 What-If Scenario Analysis")
         
@@ -601,11 +604,11 @@ elif page == "🔮 Predictive Insights":
         
         fig_scenarios.add_trace(
             go.Bar(
-                x=data['what_if']['Scenario'],
-                y=data['what_if']['Total_Leads'],
+                x=data['what_if_scenarios']['Scenario'],
+                y=data['what_if_scenarios']['Total_Leads'],
                 name='Leads',
                 marker_color='#1f77b4',
-                text=data['what_if']['Total_Leads'].round(0),
+                text=data['what_if_scenarios']['Total_Leads'].round(0),
                 textposition='outside'
             ),
             row=1, col=1
@@ -613,11 +616,11 @@ elif page == "🔮 Predictive Insights":
         
         fig_scenarios.add_trace(
             go.Bar(
-                x=data['what_if']['Scenario'],
-                y=data['what_if']['Avg_CPL'],
+                x=data['what_if_scenarios']['Scenario'],
+                y=data['what_if_scenarios']['Avg_CPL'],
                 name='CPL',
                 marker_color='#ff6b6b',
-                text=data['what_if']['Avg_CPL'].round(2),
+                text=data['what_if_scenarios']['Avg_CPL'].round(2),
                 textposition='outside'
             ),
             row=1, col=2
@@ -628,7 +631,7 @@ elif page == "🔮 Predictive Insights":
         st.plotly_chart(fig_scenarios, use_container_width=True)
         
         # Best scenario highlight
-        best_scenario = data['what_if'].loc[data['what_if']['Total_Leads'].idxmax()]
+        best_scenario = data['what_if_scenarios'].loc[data['what_if_scenarios']['Total_Leads'].idxmax()]
         st.success(f"""
         **Recommended Scenario:** {best_scenario['Scenario']}
         - Predicted Leads: {best_scenario['Total_Leads']:.0f} (+{best_scenario['Improvement_Leads']:.1f}%)
@@ -0,0 +1,175 @@
+"""Incremental refresh of the lead cube and report CSVs from new exports.
+
+Rather than recomputing all history from the workbook, each run ingests only
+the rows newer than what has already been processed:
+
+- ``watermarks.parquet`` records the latest 'Reporting starts' ingested per
+  campaign. Rows at or before a campaign's watermark belong to an export
+  window that was already ingested and are skipped.
+- Within the new rows, repeated natural keys (campaign, reporting window,
+  objective) keep their last occurrence, so overlapping exports passed in
+  one run are not double counted.
+- The remaining new rows are checked against the data-quality rules of
+  campaign_validation.py, in the same modes as the batch reader. Rows set
+  aside by ``--validate quarantine`` do not advance their campaign's
+  watermark, so a corrected export can still bring them in.
+- ``lead_cube.parquet`` is the Program x Date cube of everything ingested.
+  The new rows are reduced to a delta cube and merged in by addition, and the
+  ``analysis_results/`` tables are rewritten from the merged cube. The
+  categorization thresholds are percentiles over the programs' totals, so
+  they too are exact from the merged cube, without keeping any rows.
+
+Days are treated as complete once ingested, so exports should only contain
+finished reporting days.
+
+Usage:
+    python incremental_refresh.py new_export.xlsx [another_export.xlsx ...]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from campaign_aggregates import build_cube, load_cube, merge_cubes, save_cube
+from campaign_cleaning import CAMPAIGN_MAPPING, REPORT_COLUMNS, as_resolver, clean_campaign_frame
+from campaign_dedup import DEDUP_KEY
+from campaign_ingest import CACHE_DIR, KEY_SHEET, WORKBOOK_PATH, iter_raw_batches, load_sheet
+from campaign_resolver import CampaignResolver
+from campaign_validation import MODE_REPORT, MODES, DataQualityError, as_validator
+from report_tables import RESULTS_DIR, build_report_tables, categorization_thresholds, save_report_tables
+
+STATE_DIR = os.path.join(CACHE_DIR, 'incremental')
+CUBE_FILE = 'lead_cube.parquet'
+WATERMARK_FILE = 'watermarks.parquet'
+
+NATURAL_KEY = DEDUP_KEY
+INGEST_COLUMNS = list(dict.fromkeys(REPORT_COLUMNS + NATURAL_KEY))
+
+
+def load_watermarks(state_dir=STATE_DIR):
+    """Latest ingested 'Reporting starts' per campaign (empty when starting fresh)."""
+    path = os.path.join(state_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return pd.Series(dtype='datetime64[us]', name='Reporting starts')
+    watermarks = pd.read_parquet(path)
+    return watermarks.set_index('Campaign name')['Reporting starts']
+
+
+def save_watermarks(watermarks, state_dir=STATE_DIR):
+    path = os.path.join(state_dir, WATERMARK_FILE)
+    tmp_path = f"{path}.tmp"
+    watermarks.rename_axis('Campaign name').reset_index().to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def read_new_rows(paths, watermarks, validate=MODE_REPORT):
+    """Rows of the given exports newer than each campaign's watermark.
+
+    Returns ``(new_rows, stats)``; the watermark test runs per batch so only
+    new rows are kept in memory. ``validate`` is a campaign_validation mode
+    or Validator run on the new rows once duplicates are dropped, or None to
+    skip the checks.
+    """
+    stats = {'rows_read': 0, 'rows_already_ingested': 0, 'duplicates_dropped': 0}
+    validator = as_validator(validate)
+    read_columns = INGEST_COLUMNS
+    if validator is not None:
+        read_columns = list(dict.fromkeys(INGEST_COLUMNS + validator.columns))
+    fresh = []
+    for path in paths:
+        for batch in iter_raw_batches(path, columns=read_columns):
+            stats['rows_read'] += len(batch)
+            watermark = watermarks.reindex(batch['Campaign name'].astype(str)).to_numpy()
+            is_new = pd.isna(watermark) | (batch['Reporting starts'].to_numpy() > watermark)
+            stats['rows_already_ingested'] += int((~is_new).sum())
+            if is_new.any():
+                fresh.append(batch[is_new])
+    if not fresh:
+        return pd.DataFrame(columns=INGEST_COLUMNS), stats
+
+    new_rows = pd.concat(fresh, ignore_index=True)
+    before = len(new_rows)
+    # Later exports win when the same reporting window appears more than once
+    new_rows = new_rows.drop_duplicates(NATURAL_KEY, keep='last')
+    stats['duplicates_dropped'] = before - len(new_rows)
+    if validator is not None:
+        # Offending rows are kept, dropped or raised on per the mode
+        kept = list(validator.validate([new_rows]))
+        new_rows = kept[0] if kept else new_rows.iloc[:0]
+        stats['validation'] = validator
+    return new_rows[INGEST_COLUMNS], stats
+
+
+def refresh(paths, state_dir=STATE_DIR, results_dir=RESULTS_DIR, campaign_mapping=CAMPAIGN_MAPPING,
+            validate=MODE_REPORT):
+    """Ingest new rows from ``paths``, update the persisted cube and rewrite the report CSVs.
+
+    ``validate`` is passed on to :func:`read_new_rows`.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    cube_path = os.path.join(state_dir, CUBE_FILE)
+    watermarks = load_watermarks(state_dir)
+
+    new_rows, stats = read_new_rows(paths, watermarks, validate)
+    stats['rows_new'] = len(new_rows)
+    if new_rows.empty:
+        return stats
+
+    latest = new_rows.groupby('Campaign name', observed=True)['Reporting starts'].max()
+    watermarks = pd.concat([watermarks, latest]).groupby(level=0).max()
+
+    new_leads = new_rows[new_rows['Objective'] == 'Leads']
+    delta = build_cube([clean_campaign_frame(new_leads.copy(deep=False), as_resolver(campaign_mapping))])
+    cube = merge_cubes([load_cube(cube_path), delta]) if os.path.exists(cube_path) else delta
+
+    save_cube(cube, cube_path)
+    save_watermarks(watermarks, state_dir)
+    tables = build_report_tables(cube)
+    save_report_tables(tables, results_dir)
+    stats['campaigns_advanced'] = len(latest)
+    stats['thresholds'] = categorization_thresholds(tables['program_performance'])
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('exports', nargs='*', default=[WORKBOOK_PATH],
+                        help='Workbook exports to ingest, oldest first')
+    parser.add_argument('--key-workbook', default=WORKBOOK_PATH,
+                        help="Workbook whose 'Campaign Name Key' sheet maps campaigns to programs")
+    parser.add_argument('--state-dir', default=STATE_DIR)
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--validate', choices=MODES, default=MODE_REPORT,
+                        help='What to do with new rows breaking a data-quality rule')
+    args = parser.parse_args()
+
+    campaign_mapping = CAMPAIGN_MAPPING
+    if os.path.exists(args.key_workbook):
+        campaign_mapping = CampaignResolver.from_key_sheet(load_sheet(KEY_SHEET, args.key_workbook))
+
+    start = time.time()
+    try:
+        stats = refresh(args.exports, args.state_dir, args.results_dir, campaign_mapping, args.validate)
+    except DataQualityError as exc:
+        sys.exit(f"Nothing ingested: {exc}")
+    print(f"Read {stats['rows_read']} rows: {stats['rows_new']} new, "
+          f"{stats['rows_already_ingested']} already ingested, "
+          f"{stats['duplicates_dropped']} duplicates dropped")
+    validator = stats.get('validation')
+    if validator is not None and validator.violations:
+        kept = 'rows kept' if args.validate == MODE_REPORT else f"{validator.quarantined} rows quarantined"
+        print(f"\nData-quality violations in the new rows ({kept}):")
+        print(validator.report().to_string(index=False))
+    if stats['rows_new']:
+        print(f"Advanced {stats['campaigns_advanced']} campaigns; "
+              f"reports rewritten in {args.results_dir}/ ({time.time() - start:.2f}s)")
+        print("\nCategorization thresholds over all ingested history:")
+        print(pd.DataFrame([stats['thresholds']]).round(2).to_string(index=False))
+    else:
+        print("Nothing new to ingest; reports left unchanged")
+
+
+if __name__ == '__main__':
+    main()
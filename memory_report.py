@@ -0,0 +1,100 @@
+"""Peak memory of the cleaning stage, with and without full-frame copies.
+
+Builds a synthetic RAW DATA frame of ``--rows`` rows by resampling the
+workbook's rows, then runs :func:`campaign_cleaning.clean_campaign_frame` on
+the whole frame in a fresh process per variant and reports each process's
+peak RSS:
+
+- ``copy``: the former stage, ``clean_campaign_frame(df_raw.copy())``
+  followed by ``df[df['Objective'] == 'Leads'].copy()``
+- ``shared``: the current stage, cleaning a shallow copy and keeping the
+  Leads selection as is; cleaning replaces columns rather than writing into
+  them, so the shared columns of the raw frame are left untouched
+
+Only the cleaning step is measured: the rows are handed to it in memory, not
+read through :func:`campaign_cleaning.load_campaign_data`, so deduplication
+and the data-quality checks do not run (resampled rows repeat their keys by
+construction and would all but vanish in deduplication).
+
+Peak RSS only grows within a process, so each variant runs in its own
+subprocess and reports the peak after building the input and after the
+stage; the difference is what the stage itself adds.
+
+Usage:
+    python memory_report.py --rows 2000000
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from campaign_cleaning import clean_campaign_frame
+from campaign_ingest import KEY_SHEET, RAW_SHEET, load_sheet
+from campaign_resolver import CampaignResolver
+
+VARIANTS = ('copy', 'shared')
+DEFAULT_ROWS = 2_000_000
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+def synthetic_raw(rows, seed=0):
+    """``rows`` rows resampled from the workbook's RAW DATA sheet."""
+    raw = load_sheet(RAW_SHEET)
+    picks = np.random.default_rng(seed).integers(0, len(raw), rows)
+    return raw.take(picks).reset_index(drop=True)
+
+
+def run_stage(variant, rows):
+    """Run one variant in this process; returns the report row."""
+    resolver = CampaignResolver.from_key_sheet(load_sheet(KEY_SHEET))
+    df_raw = synthetic_raw(rows)
+    input_peak = peak_rss_mb()
+    if variant == 'copy':
+        df = clean_campaign_frame(df_raw.copy(), resolver)
+        df_leads = df[df['Objective'] == 'Leads'].copy()
+    else:
+        df = clean_campaign_frame(df_raw.copy(deep=False), resolver)
+        df_leads = df[df['Objective'] == 'Leads']
+    return {
+        'Variant': variant,
+        'Rows': rows,
+        'Lead_Rows': len(df_leads),
+        'Input_Peak_MB': input_peak,
+        'Stage_Peak_MB': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help='Synthetic RAW DATA rows')
+    parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        # Child process: print this variant's row for the parent to collect
+        print(json.dumps(run_stage(args.variant, args.rows)))
+        return
+
+    rows = []
+    for variant in VARIANTS:
+        out = subprocess.run([sys.executable, __file__, '--rows', str(args.rows), '--variant', variant],
+                             check=True, capture_output=True, text=True).stdout
+        rows.append(json.loads(out.strip().splitlines()[-1]))
+    report = pd.DataFrame(rows)
+    report['Stage_Added_MB'] = report['Stage_Peak_MB'] - report['Input_Peak_MB']
+    print(report.round(1).to_string(index=False))
+    before, after = report.set_index('Variant')['Stage_Peak_MB'][list(VARIANTS)]
+    print(f"\nPeak RSS {before:,.0f} MB -> {after:,.0f} MB ({(1 - after / before) * 100:.0f}% lower)")
+
+
+if __name__ == '__main__':
+    main()
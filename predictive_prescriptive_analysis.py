@@ -1,7 +1,5 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
@@ -10,60 +8,31 @@ from sklearn.model_selection import train_test_split
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set style
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (14, 8)
-plt.rcParams['font.size'] = 10
+from campaign_aggregates import rollup
+from campaign_store import build_lead_cube
+from chart_server import request_charts
+from chart_outputs import REPORT_PROFILES, chart_cache_summary
 
 # Load data
 print("Loading data...")
-df_key = pd.read_excel('Mediately Data Scientist.xlsx', sheet_name='Campaign Name Key')
-df_raw = pd.read_excel('Mediately Data Scientist.xlsx', sheet_name='RAW DATA')
-
-# Clean data (same as before)
-campaign_mapping = {
-    'COLLEGE_WW_MSEM_Conversions_Nov24': 'MS in engineering management',
-    'COLLEGE_MSO_Conversions_WW_July24': 'Masters of space operations',
-    'COLLEGE_MSEM_Conversions_WW_July24': 'MS in engineering management',
-    'COLLEGE_BSE_Conversions_WW_July24': 'Bachelors of science in engineering',
-    'COLLEGE_MBAA_Conversions_WW_July24': 'MBA Airlines',
-    'COLLEGE_Military_Conversions_WW_July24': 'Military focused campaign',
-    'COLLEGE_MSM_Conversions_WW_July24': 'MS in management',
-    'COLLEGE_BSA_Conversions_WW_July24': 'Bachelors of science in aerospace'
-}
-
-df = df_raw.copy()
-df['Program'] = df['Campaign name'].map(campaign_mapping)
-df['Program'] = df['Program'].fillna(df['Campaign name'])
-
-df['Date'] = pd.to_datetime(df['Reporting starts'])
-df['Month'] = df['Date'].dt.month
-df['Month_Name'] = df['Date'].dt.strftime('%b')
-df['Quarter'] = df['Date'].dt.quarter
-df['Week'] = df['Date'].dt.isocalendar().week
-df['Year'] = df['Date'].dt.year
-
-df['Link clicks'] = df['Link clicks'].fillna(0)
-df['Landing page views'] = df['Landing page views'].fillna(0)
-df['Results'] = df['Results'].fillna(0)
-df['CPL'] = np.where(df['Results'] > 0, df['Amount spent (USD)'] / df['Results'], np.nan)
+# Clean data (same as before), reading only Leads rows and the report columns,
+# into the same Program x Date cube the descriptive report rolls up from
+lead_cube = build_lead_cube()
 
-df_leads = df[df['Objective'] == 'Leads'].copy()
-
-print(f"Data loaded: {len(df_leads)} records")
+print(f"Data loaded: {lead_cube['Rows'].sum()} records")
 
 # ============================================================================
 # PREDICTIVE ANALYSIS 1: Forecast Lead Volume by Month
 # ============================================================================
 print("\n=== PREDICTIVE ANALYSIS 1: Lead Volume Forecasting ===")
 
-monthly_data = df_leads.groupby(['Month']).agg({
+monthly_data = rollup(lead_cube, 'Month', {
     'Results': 'sum',
     'Amount spent (USD)': 'sum',
     'Link clicks': 'sum',
     'Landing page views': 'sum',
-    'CPL': lambda x: x[x.notna()].mean()
-}).reset_index()
+    'CPL': 'ratio'
+})
 
 monthly_data = monthly_data.sort_values('Month')
 
@@ -102,52 +71,25 @@ month_names = ['Jul 2025', 'Aug 2025', 'Sep 2025', 'Oct 2025', 'Nov 2025', 'Dec
 for i, (month, leads, cpl) in enumerate(zip(month_names, forecast_leads_adjusted, forecast_cpl_adjusted)):
     print(f"{month}: {leads:.0f} leads, CPL: ${cpl:.2f}")
 
-# Visualization
-fig, axes = plt.subplots(2, 1, figsize=(14, 10))
-
-# Historical + Forecast Leads
-historical_months = monthly_data['Month'].values
-historical_leads = monthly_data['Results'].values
-all_months = np.concatenate([historical_months, future_months.flatten()])
-all_leads = np.concatenate([historical_leads, forecast_leads_adjusted])
-
-axes[0].plot(historical_months, historical_leads, 'o-', label='Historical', linewidth=2, markersize=8)
-axes[0].plot(future_months.flatten(), forecast_leads_adjusted, 's--', label='Forecast', linewidth=2, markersize=8, color='red')
-axes[0].axvline(x=6, color='gray', linestyle='--', alpha=0.5, label='Forecast Start')
-axes[0].set_xlabel('Month (1=Jul, 12=Jun)', fontsize=12)
-axes[0].set_ylabel('Lead Volume', fontsize=12)
-axes[0].set_title('Lead Volume Forecast - Next 6 Months', fontsize=14, fontweight='bold')
-axes[0].legend()
-axes[0].grid(True, alpha=0.3)
-axes[0].set_xticks(range(1, 13))
-
-# Historical + Forecast CPL
-axes[1].plot(historical_months, y_cpl, 'o-', label='Historical', linewidth=2, markersize=8)
-axes[1].plot(future_months.flatten(), forecast_cpl_adjusted, 's--', label='Forecast', linewidth=2, markersize=8, color='red')
-axes[1].axvline(x=6, color='gray', linestyle='--', alpha=0.5, label='Forecast Start')
-axes[1].set_xlabel('Month (1=Jul, 12=Jun)', fontsize=12)
-axes[1].set_ylabel('CPL (USD)', fontsize=12)
-axes[1].set_title('CPL Forecast - Next 6 Months', fontsize=14, fontweight='bold')
-axes[1].legend()
-axes[1].grid(True, alpha=0.3)
-axes[1].set_xticks(range(1, 13))
-
-plt.tight_layout()
-plt.savefig('charts/07_predictive_forecast.png', dpi=300, bbox_inches='tight')
-plt.close()
+# Chart input: history (missing CPL filled as fitted) and the adjusted forecast
+forecast_history = pd.DataFrame({'Month': monthly_data['Month'].values, 'Results': y_leads, 'CPL': y_cpl})
+forecast_table = pd.DataFrame({'Month': future_months.flatten(), 'Results': forecast_leads_adjusted,
+                               'CPL': forecast_cpl_adjusted})
+chart_jobs = [('forecast', 'charts/07_predictive_forecast.png',
+               {'history': forecast_history, 'forecast': forecast_table})]
 
 # ============================================================================
 # PREDICTIVE ANALYSIS 2: Program Performance Prediction
 # ============================================================================
 print("\n=== PREDICTIVE ANALYSIS 2: Program Performance Prediction ===")
 
-program_data = df_leads.groupby('Program').agg({
+program_data = rollup(lead_cube, 'Program', {
     'Amount spent (USD)': 'sum',
     'Results': 'sum',
     'Link clicks': 'sum',
     'Landing page views': 'sum',
-    'CPL': lambda x: x[x.notna()].mean()
-}).reset_index()
+    'CPL': 'ratio'
+})
 
 program_data['Click_to_Submit_Rate'] = (program_data['Results'] / program_data['Link clicks'] * 100).fillna(0)
 program_data['LPV_to_Submit_Rate'] = (program_data['Results'] / program_data['Landing page views'] * 100).fillna(0)
@@ -173,7 +115,7 @@ print("\n=== PRESCRIPTIVE ANALYSIS 1: Optimal Budget Allocation ===")
 # Load program ROI data
 program_roi = pd.read_csv('analysis_results/program_roi.csv')
 
-# Filter out programs with no leads
+# Filter out programs with no leads; a copy, since the optimal budget columns are added to it
 program_roi_clean = program_roi[program_roi['Efficiency_Score'].notna() & (program_roi['Results'] > 0)].copy()
 
 # Current total budget
@@ -229,26 +171,9 @@ print("\nScenario 3: Balanced Approach (Recommended)")
 print(program_roi_clean[['Program', 'Amount spent (USD)', 'Optimal_Budget_Balanced', 
                          'Predicted_Leads_Balanced']].to_string())
 
-# Visualization
-fig, ax = plt.subplots(figsize=(14, 8))
-x = np.arange(len(program_roi_clean))
-width = 0.25
-
-ax.bar(x - width, program_roi_clean['Amount spent (USD)'], width, label='Current Budget', alpha=0.8)
-ax.bar(x, program_roi_clean['Optimal_Budget_Balanced'], width, label='Optimal Budget (Balanced)', alpha=0.8)
-ax.bar(x + width, program_roi_clean['Optimal_Budget_Volume'], width, label='Optimal Budget (Volume)', alpha=0.8)
-
-ax.set_xlabel('Program', fontsize=12)
-ax.set_ylabel('Budget (USD)', fontsize=12)
-ax.set_title('Optimal Budget Allocation Scenarios', fontsize=14, fontweight='bold')
-ax.set_xticks(x)
-ax.set_xticklabels([p[:20] for p in program_roi_clean['Program']], rotation=45, ha='right')
-ax.legend()
-ax.grid(True, alpha=0.3, axis='y')
-
-plt.tight_layout()
-plt.savefig('charts/08_optimal_budget_allocation.png', dpi=300, bbox_inches='tight')
-plt.close()
+chart_jobs.append(('optimal_budget', 'charts/08_optimal_budget_allocation.png',
+                   {'allocation': program_roi_clean[['Program', 'Amount spent (USD)', 'Optimal_Budget_Balanced',
+                                                     'Optimal_Budget_Volume']]}))
 
 # ============================================================================
 # PRESCRIPTIVE ANALYSIS 2: What-If Scenarios
@@ -272,42 +197,27 @@ scenarios = {
 
 scenario_results = []
 
+# Scenarios are computed as columns over program_roi_clean rather than on
+# copies of it; the base table is never modified
+current_spend = program_roi_clean['Amount spent (USD)']
+
 for scenario_name, params in scenarios.items():
-    scenario_df = program_roi_clean.copy()
+    adjusted = program_roi_clean['Program'].isin(params['programs'])
     
-    # Adjust budgets
-    for program in params['programs']:
-        mask = scenario_df['Program'] == program
-        if params['increase'] == 0.0:
-            # Pause - set to 0
-            scenario_df.loc[mask, 'Scenario_Budget'] = 0
-        else:
-            scenario_df.loc[mask, 'Scenario_Budget'] = (
-                scenario_df.loc[mask, 'Amount spent (USD)'] * params['increase']
-            )
-    
-    # Reallocate paused budgets to top performers
     if params['increase'] == 0.0:
-        paused_budget = scenario_df[scenario_df['Program'].isin(params['programs'])]['Amount spent (USD)'].sum()
-        top_programs = scenario_df[~scenario_df['Program'].isin(params['programs'])].nlargest(3, 'Efficiency_Score')
-        reallocation_per_program = paused_budget / len(top_programs)
-        for program in top_programs['Program']:
-            mask = scenario_df['Program'] == program
-            scenario_df.loc[mask, 'Scenario_Budget'] = (
-                scenario_df.loc[mask, 'Amount spent (USD)'] + reallocation_per_program
-            )
-    
-    # Fill non-adjusted programs
-    scenario_df['Scenario_Budget'] = scenario_df['Scenario_Budget'].fillna(
-        scenario_df['Amount spent (USD)']
-    )
+        # Pause, then reallocate the paused budgets to the top performers
+        scenario_budget = current_spend.where(~adjusted, 0.0)
+        top_programs = program_roi_clean[~adjusted].nlargest(3, 'Efficiency_Score').index
+        reallocation_per_program = current_spend[adjusted].sum() / len(top_programs)
+        scenario_budget[top_programs] = current_spend[top_programs] + reallocation_per_program
+    else:
+        scenario_budget = current_spend.where(~adjusted, current_spend * params['increase'])
     
-    # Calculate predicted leads
-    scenario_df['Scenario_Leads'] = scenario_df['Scenario_Budget'] / scenario_df['CPL']
-    scenario_df['Scenario_CPL'] = scenario_df['CPL']  # Assume same CPL
+    # Calculate predicted leads (assume same CPL)
+    scenario_leads = scenario_budget / program_roi_clean['CPL']
     
-    total_budget = scenario_df['Scenario_Budget'].sum()
-    total_leads = scenario_df['Scenario_Leads'].sum()
+    total_budget = scenario_budget.sum()
+    total_leads = scenario_leads.sum()
     avg_cpl = total_budget / total_leads if total_leads > 0 else np.nan
     
     scenario_results.append({
@@ -328,36 +238,11 @@ for scenario_name, params in scenarios.items():
 scenario_df_results = pd.DataFrame(scenario_results)
 scenario_df_results.to_csv('analysis_results/what_if_scenarios.csv', index=False)
 
-# Visualization
-fig, axes = plt.subplots(1, 2, figsize=(16, 6))
-
-# Leads comparison
-axes[0].bar(range(len(scenario_results)), [r['Total_Leads'] for r in scenario_results], 
-           alpha=0.7, color=['steelblue', 'green', 'orange'])
-axes[0].axhline(y=program_roi_clean['Results'].sum(), color='red', linestyle='--', 
-               label=f'Current Leads ({program_roi_clean["Results"].sum():.0f})')
-axes[0].set_xticks(range(len(scenario_results)))
-axes[0].set_xticklabels([r['Scenario'] for r in scenario_results], rotation=15, ha='right')
-axes[0].set_ylabel('Total Leads', fontsize=12)
-axes[0].set_title('What-If Scenarios: Predicted Lead Volume', fontsize=14, fontweight='bold')
-axes[0].legend()
-axes[0].grid(True, alpha=0.3, axis='y')
-
-# CPL comparison
-axes[1].bar(range(len(scenario_results)), [r['Avg_CPL'] for r in scenario_results], 
-           alpha=0.7, color=['steelblue', 'green', 'orange'])
-axes[1].axhline(y=program_roi_clean['CPL'].mean(), color='red', linestyle='--', 
-               label=f'Current Avg CPL (${program_roi_clean["CPL"].mean():.2f})')
-axes[1].set_xticks(range(len(scenario_results)))
-axes[1].set_xticklabels([r['Scenario'] for r in scenario_results], rotation=15, ha='right')
-axes[1].set_ylabel('Average CPL (USD)', fontsize=12)
-axes[1].set_title('What-If Scenarios: Average CPL', fontsize=14, fontweight='bold')
-axes[1].legend()
-axes[1].grid(True, alpha=0.3, axis='y')
-
-plt.tight_layout()
-plt.savefig('charts/09_what_if_scenarios.png', dpi=300, bbox_inches='tight')
-plt.close()
+chart_jobs.append(('what_if', 'charts/09_what_if_scenarios.png', {
+    'scenarios': scenario_df_results,
+    'current_leads': program_roi_clean['Results'].sum(),
+    'current_cpl': program_roi_clean['CPL'].mean(),
+}))
 
 # ============================================================================
 # PRESCRIPTIVE ANALYSIS 3: ROI Optimization Model
@@ -373,8 +258,6 @@ roi_scenarios = []
 base_cpl = program_roi_clean['CPL'].mean()
 
 for budget_multiplier in budget_levels:
-    scenario_budget = program_roi_clean.copy()
-    
     # Apply diminishing returns: CPL increases as budget scales beyond 1.0
     # Formula: CPL_multiplier = 1 + (budget_multiplier - 1) * diminishing_factor
     # This means:
@@ -385,19 +268,15 @@ for budget_multiplier in budget_levels:
     cpl_multiplier = 1 + (budget_multiplier - 1.0) * diminishing_factor
     
     # Adjust CPL based on diminishing returns
-    scenario_budget['Adjusted_CPL'] = scenario_budget['CPL'] * cpl_multiplier
+    adjusted_cpl = program_roi_clean['CPL'] * cpl_multiplier
     
-    scenario_budget['Allocated_Budget'] = (
-        scenario_budget['Optimal_Budget_Balanced'] * budget_multiplier
-    )
+    allocated_budget = program_roi_clean['Optimal_Budget_Balanced'] * budget_multiplier
     
     # Calculate leads with adjusted CPL (accounting for diminishing returns)
-    scenario_budget['Predicted_Leads'] = (
-        scenario_budget['Allocated_Budget'] / scenario_budget['Adjusted_CPL']
-    )
+    predicted_leads = allocated_budget / adjusted_cpl
     
-    total_budget = scenario_budget['Allocated_Budget'].sum()
-    total_leads = scenario_budget['Predicted_Leads'].sum()
+    total_budget = allocated_budget.sum()
+    total_leads = predicted_leads.sum()
     avg_cpl = total_budget / total_leads if total_leads > 0 else np.nan
     roi = total_leads / total_budget if total_budget > 0 else 0
     
@@ -415,24 +294,12 @@ print(roi_df.to_string(index=False))
 
 roi_df.to_csv('analysis_results/roi_optimization.csv', index=False)
 
-# Visualization
-fig, axes = plt.subplots(1, 2, figsize=(16, 6))
-
-axes[0].plot(roi_df['Total_Budget'], roi_df['Total_Leads'], 'o-', linewidth=2, markersize=8)
-axes[0].set_xlabel('Total Budget (USD)', fontsize=12)
-axes[0].set_ylabel('Total Leads', fontsize=12)
-axes[0].set_title('Budget vs. Lead Volume', fontsize=14, fontweight='bold')
-axes[0].grid(True, alpha=0.3)
-
-axes[1].plot(roi_df['Total_Budget'], roi_df['ROI'], 'o-', linewidth=2, markersize=8, color='green')
-axes[1].set_xlabel('Total Budget (USD)', fontsize=12)
-axes[1].set_ylabel('ROI (Leads per Dollar)', fontsize=12)
-axes[1].set_title('Budget vs. ROI', fontsize=14, fontweight='bold')
-axes[1].grid(True, alpha=0.3)
+chart_jobs.append(('roi_optimization', 'charts/10_roi_optimization.png', {'roi': roi_df}))
 
-plt.tight_layout()
-plt.savefig('charts/10_roi_optimization.png', dpi=300, bbox_inches='tight')
-plt.close()
+# Charts 07-10 are pure functions of the tables above; render them in a
+# process pool, one figure per worker task. Charts whose inputs are unchanged
+# since an earlier run are copied from the chart cache instead
+print(chart_cache_summary(request_charts(chart_jobs, profiles=REPORT_PROFILES)))
 
 print("\n=== ANALYSIS COMPLETE ===")
 print("All predictive and prescriptive analyses saved!")
@@ -0,0 +1,398 @@
+"""Report charts 01-10 as pure functions of their input tables.
+
+Each chart function takes the tables (and plain values) it plots plus an
+output path, draws on a figure of its own and saves it. It reads no globals
+and nothing drawn before it, so charts can render in any order and in any
+process once their inputs exist.
+
+The scripts build a list of chart jobs, ``(chart name, path, inputs)``, and
+:func:`render_charts` renders them in a process pool, one figure per task.
+:func:`descriptive_chart_jobs` builds the jobs of charts 01-06 from the
+report tables, for full_analysis.py and for every tenant in batch mode.
+
+A job is written in one or more output profiles (``OUTPUT_PROFILES``, see
+chart_outputs.py), so each consumer gets the cheapest asset it can use.
+chart_profile_benchmark.py measures render time and file size per profile.
+
+Rendered charts are content addressed: a chart's key is the SHA-256 of its
+name, its output profile, its input data, the chart style, the plotting
+library versions and the source of this module. Files are kept in a store
+under ``.cache/charts/<key>.<format>``; a job whose key is already stored is
+served by copying the stored file, and only changed charts are drawn again.
+"""
+import hashlib
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from campaign_ingest import CACHE_DIR
+from chart_outputs import (CHARTS_DIR, DEFAULT_PROFILE, OUTPUT_PROFILES, REPORT_PROFILES,  # noqa: F401
+                           chart_asset, chart_cache_summary, descriptive_chart_jobs, output_profile,
+                           profile_path)
+
+CHART_CACHE_DIR = os.path.join(CACHE_DIR, 'charts')
+
+# Lines and scatter collections of at least this many points are rasterized
+# in profiles that ask for it; a vector file then holds one image for them
+# instead of a path element per point
+RASTERIZE_MIN_POINTS = 1000
+
+CHART_STYLE = 'whitegrid'
+CHART_RC_PARAMS = {'figure.figsize': (14, 8), 'font.size': 10}
+
+# Category -> bar/marker colour in charts 04 and 06
+CATEGORY_COLORS = {'Underperforming': 'red', 'High CPL': 'orange', 'Low Conversion': 'yellow',
+                   'Performing Well': 'green', 'No Leads': 'gray'}
+
+
+def apply_chart_style():
+    """The seaborn style and matplotlib defaults every report chart is drawn with."""
+    sns.set_style(CHART_STYLE)
+    plt.rcParams.update(CHART_RC_PARAMS)
+
+
+def _rasterize_dense(fig, min_points=RASTERIZE_MIN_POINTS):
+    for ax in fig.axes:
+        for line in ax.lines:
+            if len(line.get_xdata()) >= min_points:
+                line.set_rasterized(True)
+        for collection in ax.collections:
+            if len(collection.get_offsets()) >= min_points:
+                collection.set_rasterized(True)
+
+
+def _save(fig, path, profile):
+    settings = output_profile(profile)
+    if settings['scale'] != 1:
+        fig.set_size_inches(fig.get_size_inches() * settings['scale'])
+    if settings['rasterize']:
+        _rasterize_dense(fig)
+    fig.tight_layout()
+    fig.savefig(path, dpi=settings['dpi'], format=settings['format'], bbox_inches='tight')
+    plt.close(fig)
+
+
+def seasonality_chart(monthly_stats, path, profile=DEFAULT_PROFILE):
+    fig, axes = plt.subplots(2, 1, figsize=(14, 10))
+
+    # Lead volume by month
+    axes[0].plot(monthly_stats['Month_Name'], monthly_stats['Results'], marker='o', linewidth=2, markersize=8)
+    axes[0].set_title('Lead Volume by Month (FY2024)', fontsize=14, fontweight='bold')
+    axes[0].set_xlabel('Month', fontsize=12)
+    axes[0].set_ylabel('Total Leads', fontsize=12)
+    axes[0].grid(True, alpha=0.3)
+    axes[0].tick_params(axis='x', rotation=45)
+
+    # CPL by month
+    axes[1].plot(monthly_stats['Month_Name'], monthly_stats['CPL'], marker='o', linewidth=2, markersize=8,
+                 color='orange')
+    axes[1].set_title('Average Cost Per Lead (CPL) by Month (FY2024)', fontsize=14, fontweight='bold')
+    axes[1].set_xlabel('Month', fontsize=12)
+    axes[1].set_ylabel('Average CPL (USD)', fontsize=12)
+    axes[1].grid(True, alpha=0.3)
+    axes[1].tick_params(axis='x', rotation=45)
+
+    _save(fig, path, profile)
+
+
+def conversion_rate_chart(rates, path, title, color, profile=DEFAULT_PROFILE):
+    """Horizontal bars of 'Conversion_Rate' by program, with value labels."""
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.barh(rates['Program'], rates['Conversion_Rate'], color=color)
+    ax.set_xlabel('Conversion Rate (%)', fontsize=12)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3, axis='x')
+
+    # Add value labels
+    for i, rate in enumerate(rates['Conversion_Rate']):
+        ax.text(rate + 0.1, i, f"{rate:.2f}%", va='center', fontsize=10)
+
+    _save(fig, path, profile)
+
+
+def underperforming_chart(program_performance, cpl_median, conversion_median, path, profile=DEFAULT_PROFILE):
+    fig, axes = plt.subplots(1, 2, figsize=(16, 6))
+
+    # CPL vs Conversion Rate scatter
+    for category in program_performance['Category'].unique():
+        subset = program_performance[program_performance['Category'] == category]
+        axes[0].scatter(subset['Click_to_Submit_Rate'], subset['CPL'],
+                        label=category, s=200, alpha=0.7, c=CATEGORY_COLORS.get(category, 'blue'))
+        for _, row in subset.iterrows():
+            axes[0].annotate(row['Program'][:20],
+                             (row['Click_to_Submit_Rate'], row['CPL']),
+                             fontsize=8, alpha=0.7)
+
+    axes[0].axhline(y=cpl_median, color='gray', linestyle='--', alpha=0.5, label=f'Median CPL: ${cpl_median:.2f}')
+    axes[0].axvline(x=conversion_median, color='gray', linestyle='--', alpha=0.5,
+                    label=f'Median Conversion: {conversion_median:.2f}%')
+    axes[0].set_xlabel('Click-to-Submit Conversion Rate (%)', fontsize=12)
+    axes[0].set_ylabel('Cost Per Lead (USD)', fontsize=12)
+    axes[0].set_title('Program Performance: CPL vs Conversion Rate', fontsize=14, fontweight='bold')
+    axes[0].legend()
+    axes[0].grid(True, alpha=0.3)
+
+    # CPL by program
+    by_cpl = program_performance.sort_values('CPL', ascending=True)
+    axes[1].barh(by_cpl['Program'], by_cpl['CPL'],
+                 color=[CATEGORY_COLORS.get(cat, 'blue') for cat in by_cpl['Category']])
+    axes[1].set_xlabel('Cost Per Lead (USD)', fontsize=12)
+    axes[1].set_title('Cost Per Lead by Program', fontsize=14, fontweight='bold')
+    axes[1].grid(True, alpha=0.3, axis='x')
+
+    _save(fig, path, profile)
+
+
+def _trend_panel(ax, monthly_trends, column, label, color):
+    # Monthly engagement metric against leads on a twin axis
+    twin = ax.twinx()
+    lines = ax.plot(monthly_trends['Month_Name'], monthly_trends[column],
+                    marker='o', label=label, color=color, linewidth=2)
+    lines += twin.plot(monthly_trends['Month_Name'], monthly_trends['Results'],
+                       marker='s', label='Leads', color='red', linewidth=2)
+    ax.set_xlabel('Month', fontsize=12)
+    ax.set_ylabel(label, fontsize=12, color=color)
+    twin.set_ylabel('Leads', fontsize=12, color='red')
+    ax.set_title(f'Monthly Trend: {label} vs Leads', fontsize=14, fontweight='bold')
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(True, alpha=0.3)
+    ax.legend(lines, [line.get_label() for line in lines], loc='upper left')
+
+
+def engagement_trends_chart(monthly_trends, path, profile=DEFAULT_PROFILE):
+    fig, axes = plt.subplots(2, 1, figsize=(14, 10))
+    _trend_panel(axes[0], monthly_trends, 'Link clicks', 'Link Clicks', 'blue')
+    _trend_panel(axes[1], monthly_trends, 'Landing page views', 'Landing Page Views', 'green')
+    _save(fig, path, profile)
+
+
+def budget_allocation_chart(program_roi, path, profile=DEFAULT_PROFILE):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.barh(program_roi['Program'], program_roi['Efficiency_Score'],
+            color=[CATEGORY_COLORS.get(cat, 'blue') for cat in program_roi['Category']])
+    ax.set_xlabel('Efficiency Score', fontsize=12)
+    ax.set_title('Program Efficiency Score (Higher = Better ROI)', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3, axis='x')
+    _save(fig, path, profile)
+
+
+def forecast_chart(history, forecast, path, forecast_start=6, profile=DEFAULT_PROFILE):
+    """Historical and forecast 'Results' and 'CPL' by fiscal 'Month'."""
+    fig, axes = plt.subplots(2, 1, figsize=(14, 10))
+    for ax, column, label in zip(axes, ['Results', 'CPL'], ['Lead Volume', 'CPL']):
+        ax.plot(history['Month'], history[column], 'o-', label='Historical', linewidth=2, markersize=8)
+        ax.plot(forecast['Month'], forecast[column], 's--', label='Forecast', linewidth=2, markersize=8,
+                color='red')
+        ax.axvline(x=forecast_start, color='gray', linestyle='--', alpha=0.5, label='Forecast Start')
+        ax.set_xlabel('Month (1=Jul, 12=Jun)', fontsize=12)
+        ax.set_ylabel('CPL (USD)' if column == 'CPL' else label, fontsize=12)
+        ax.set_title(f'{label} Forecast - Next 6 Months', fontsize=14, fontweight='bold')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+        ax.set_xticks(range(1, 13))
+    _save(fig, path, profile)
+
+
+def optimal_budget_chart(allocation, path, profile=DEFAULT_PROFILE):
+    fig, ax = plt.subplots(figsize=(14, 8))
+    x = np.arange(len(allocation))
+    width = 0.25
+
+    ax.bar(x - width, allocation['Amount spent (USD)'], width, label='Current Budget', alpha=0.8)
+    ax.bar(x, allocation['Optimal_Budget_Balanced'], width, label='Optimal Budget (Balanced)', alpha=0.8)
+    ax.bar(x + width, allocation['Optimal_Budget_Volume'], width, label='Optimal Budget (Volume)', alpha=0.8)
+
+    ax.set_xlabel('Program', fontsize=12)
+    ax.set_ylabel('Budget (USD)', fontsize=12)
+    ax.set_title('Optimal Budget Allocation Scenarios', fontsize=14, fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels([p[:20] for p in allocation['Program']], rotation=45, ha='right')
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+    _save(fig, path, profile)
+
+
+def what_if_chart(scenarios, current_leads, current_cpl, path, profile=DEFAULT_PROFILE):
+    fig, axes = plt.subplots(1, 2, figsize=(16, 6))
+    positions = range(len(scenarios))
+
+    # Leads comparison
+    axes[0].bar(positions, scenarios['Total_Leads'], alpha=0.7, color=['steelblue', 'green', 'orange'])
+    axes[0].axhline(y=current_leads, color='red', linestyle='--', label=f'Current Leads ({current_leads:.0f})')
+    axes[0].set_xticks(positions)
+    axes[0].set_xticklabels(scenarios['Scenario'], rotation=15, ha='right')
+    axes[0].set_ylabel('Total Leads', fontsize=12)
+    axes[0].set_title('What-If Scenarios: Predicted Lead Volume', fontsize=14, fontweight='bold')
+    axes[0].legend()
+    axes[0].grid(True, alpha=0.3, axis='y')
+
+    # CPL comparison
+    axes[1].bar(positions, scenarios['Avg_CPL'], alpha=0.7, color=['steelblue', 'green', 'orange'])
+    axes[1].axhline(y=current_cpl, color='red', linestyle='--', label=f'Current Avg CPL (${current_cpl:.2f})')
+    axes[1].set_xticks(positions)
+    axes[1].set_xticklabels(scenarios['Scenario'], rotation=15, ha='right')
+    axes[1].set_ylabel('Average CPL (USD)', fontsize=12)
+    axes[1].set_title('What-If Scenarios: Average CPL', fontsize=14, fontweight='bold')
+    axes[1].legend()
+    axes[1].grid(True, alpha=0.3, axis='y')
+
+    _save(fig, path, profile)
+
+
+def roi_optimization_chart(roi, path, profile=DEFAULT_PROFILE):
+    fig, axes = plt.subplots(1, 2, figsize=(16, 6))
+
+    axes[0].plot(roi['Total_Budget'], roi['Total_Leads'], 'o-', linewidth=2, markersize=8)
+    axes[0].set_xlabel('Total Budget (USD)', fontsize=12)
+    axes[0].set_ylabel('Total Leads', fontsize=12)
+    axes[0].set_title('Budget vs. Lead Volume', fontsize=14, fontweight='bold')
+    axes[0].grid(True, alpha=0.3)
+
+    axes[1].plot(roi['Total_Budget'], roi['ROI'], 'o-', linewidth=2, markersize=8, color='green')
+    axes[1].set_xlabel('Total Budget (USD)', fontsize=12)
+    axes[1].set_ylabel('ROI (Leads per Dollar)', fontsize=12)
+    axes[1].set_title('Budget vs. ROI', fontsize=14, fontweight='bold')
+    axes[1].grid(True, alpha=0.3)
+
+    _save(fig, path, profile)
+
+
+# Chart name -> drawing function
+CHARTS = {
+    'seasonality': seasonality_chart,
+    'conversion_rate': conversion_rate_chart,
+    'underperforming': underperforming_chart,
+    'engagement_trends': engagement_trends_chart,
+    'budget_allocation': budget_allocation_chart,
+    'forecast': forecast_chart,
+    'optimal_budget': optimal_budget_chart,
+    'what_if': what_if_chart,
+    'roi_optimization': roi_optimization_chart,
+}
+
+
+def _hash_value(digest, value):
+    # Feed a chart input into the digest: frames and arrays by content,
+    # containers element by element, anything else by repr
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        digest.update(repr([(str(col), str(dtype)) for col, dtype in frame.dtypes.items()]).encode())
+        for col in frame.columns:
+            if isinstance(frame[col].dtype, pd.CategoricalDtype):
+                digest.update(repr(list(frame[col].cat.categories)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(repr(key).encode())
+            _hash_value(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _hash_value(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+
+@lru_cache(maxsize=None)
+def _code_fingerprint():
+    with open(__file__, 'rb') as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def chart_key(job, profile=DEFAULT_PROFILE):
+    """Content key of a ``(chart name, path, inputs)`` job in ``profile``; the path is not part of it."""
+    name, _, inputs = job
+    digest = hashlib.sha256()
+    _hash_value(digest, [name, profile, output_profile(profile), CHART_STYLE, CHART_RC_PARAMS,
+                         matplotlib.__version__, sns.__version__, _code_fingerprint()])
+    _hash_value(digest, inputs)
+    return digest.hexdigest()
+
+
+def render_chart(job, profile=DEFAULT_PROFILE):
+    """Render one ``(chart name, path, inputs)`` job in ``profile``; returns the path written."""
+    name, path, inputs = job
+    path = profile_path(path, profile)
+    CHARTS[name](path=path, profile=profile, **inputs)
+    return path
+
+
+def _render_task(task):
+    return render_chart(*task)
+
+
+def _init_worker():
+    matplotlib.use('Agg')
+    apply_chart_style()
+
+
+def _render_all(tasks, workers):
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers < 2 or 'fork' not in multiprocessing.get_all_start_methods():
+        apply_chart_style()
+        return [_render_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+                             initializer=_init_worker) as pool:
+        return list(pool.map(_render_task, tasks))
+
+
+def render_charts(jobs, workers=None, cache_dir=CHART_CACHE_DIR, profiles=(DEFAULT_PROFILE,)):
+    """Write the charts of ``jobs`` in each of ``profiles``, rendering only those not in the chart store.
+
+    Charts to render go to a process pool when there is more than one of
+    them and more than one worker; ``workers`` defaults to the CPU count.
+    ``cache_dir=None`` renders everything and stores nothing. Charts of the
+    same key within one call (the same chart for several reports) render
+    once and are copied to the other paths. Returns one row per job and
+    profile: Path, Profile, Key and Status ('cached', 'rendered' or
+    'copied').
+
+    The report scripts call this at module level, and workers started by
+    spawn or forkserver would re-run the calling script on import, so the
+    pool forks; where fork is unavailable (Windows) the charts render serially.
+    """
+    tasks = [(job, profile) for job in jobs for profile in profiles]
+    paths = [profile_path(path, profile) for (_, path, _), profile in tasks]
+    for directory in set(map(os.path.dirname, paths)):
+        os.makedirs(directory or '.', exist_ok=True)
+
+    keys = [chart_key(job, profile) for job, profile in tasks]
+    stored = [os.path.join(cache_dir, key + os.path.splitext(path)[1]) if cache_dir else None
+              for key, path in zip(keys, paths)]
+    cached = [path is not None and os.path.exists(path) for path in stored]
+    for path, stored_path, hit in zip(paths, stored, cached):
+        if hit:
+            shutil.copyfile(stored_path, path)
+
+    # The first miss of each key renders; later misses of it copy that render
+    first = {}
+    for i, (key, hit) in enumerate(zip(keys, cached)):
+        if not hit:
+            first.setdefault(key, i)
+    rendered = sorted(first.values())
+    _render_all([tasks[i] for i in rendered], workers)
+    status = ['cached' if hit else 'rendered' for hit in cached]
+    for i, (key, hit) in enumerate(zip(keys, cached)):
+        if not hit and first[key] != i:
+            status[i] = 'copied'
+            if os.path.abspath(paths[i]) != os.path.abspath(paths[first[key]]):
+                shutil.copyfile(paths[first[key]], paths[i])
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        for i in rendered:
+            shutil.copyfile(paths[i], f"{stored[i]}.tmp")
+            os.replace(f"{stored[i]}.tmp", stored[i])
+
+    return pd.DataFrame({'Path': paths, 'Profile': [profile for _, profile in tasks], 'Key': keys,
+                         'Status': status})
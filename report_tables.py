@@ -0,0 +1,161 @@
+"""Report tables rolled up from the Program x Date lead cube.
+
+These are the tables full_analysis.py prints, charts and saves to
+``analysis_results/``. Building them from the cube alone lets the incremental
+refresh rewrite the CSVs without rerunning the full script.
+"""
+import os
+
+from campaign_aggregates import rollup
+from campaign_categories import categorize, category_thresholds
+from campaign_correlation import best_leading_indicators, correlation_table
+
+RESULTS_DIR = 'analysis_results'
+
+# Time keys of the weekly and monthly tables. The integer key comes first so
+# rows sort chronologically; Week and Month_Name are kept for display.
+WEEK_KEY = ['Year_Week', 'Week']
+MONTH_KEY = ['Fiscal_Period', 'Month_Name']
+
+# Output file for each table in build_report_tables
+REPORT_FILES = {
+    'monthly_stats': 'monthly_stats.csv',
+    'program_click_rates': 'program_click_rates.csv',
+    'program_lpv_rates': 'program_lpv_rates.csv',
+    'program_performance': 'program_performance.csv',
+    'program_roi': 'program_roi.csv',
+    'weekly_data': 'weekly_trends.csv',
+    'monthly_trends': 'monthly_trends.csv',
+    'lag_correlations': 'lag_correlations.csv',
+    'leading_indicators': 'leading_indicators.csv',
+}
+
+# Longest lag, in days or weeks, of the engagement vs leads correlations
+MAX_CORRELATION_LAG = 8
+
+
+def monthly_stats(cube):
+    # Keyed on the integer fiscal period, so months come out in order and
+    # the same month of different fiscal years stays separate
+    return rollup(cube, MONTH_KEY, {
+        'Results': 'sum',
+        'CPL': 'ratio',
+        'Amount spent (USD)': 'sum'
+    })
+
+
+def program_click_rates(cube):
+    table = rollup(cube, 'Program', {
+        'Link clicks': 'sum',
+        'Results': 'sum'
+    })
+    table['Conversion_Rate'] = (table['Results'] / table['Link clicks'] * 100).round(2)
+    return table.sort_values('Conversion_Rate', ascending=False)
+
+
+def program_lpv_rates(cube):
+    table = rollup(cube, 'Program', {
+        'Landing page views': 'sum',
+        'Results': 'sum'
+    })
+    table['Conversion_Rate'] = (table['Results'] / table['Landing page views'] * 100).round(2)
+    return table.sort_values('Conversion_Rate', ascending=False)
+
+
+def categorization_thresholds(performance):
+    """Percentile thresholds used to categorize programs."""
+    return category_thresholds(performance).iloc[0].to_dict()
+
+
+def program_performance(cube):
+    table = rollup(cube, 'Program', {
+        'Amount spent (USD)': 'sum',
+        'Results': 'sum',
+        'CPL': 'ratio',
+        'Link clicks': 'sum',
+        'Landing page views': 'sum',
+        'Impressions': 'sum'
+    })
+    table['Click_to_Submit_Rate'] = (table['Results'] / table['Link clicks'] * 100).round(2)
+    table['LPV_to_Submit_Rate'] = (table['Results'] / table['Landing page views'] * 100).round(2)
+    table['CTR'] = (table['Link clicks'] / table['Impressions'] * 100).round(3)
+    table['CPL'] = table['CPL'].round(2)
+
+    table['Category'] = categorize(table).astype(str)
+    return table.sort_values('CPL', ascending=False)
+
+
+def program_roi(performance):
+    table = performance.assign(
+        Leads_per_Dollar=performance['Results'] / performance['Amount spent (USD)'],
+        Efficiency_Score=(performance['Click_to_Submit_Rate'] / 100) * (1 / performance['CPL']) * 1000,
+    )
+    return table.sort_values('Efficiency_Score', ascending=False)
+
+
+def weekly_data(cube):
+    table = rollup(cube, WEEK_KEY, {
+        'Link clicks': 'sum',
+        'Landing page views': 'sum',
+        'Results': 'sum',
+        'Amount spent (USD)': 'sum'
+    })
+    # Lagged engagement for the lead correlation analysis
+    table['Clicks_Lag1'] = table['Link clicks'].shift(1)
+    table['LPV_Lag1'] = table['Landing page views'].shift(1)
+    table['Clicks_Lag2'] = table['Link clicks'].shift(2)
+    table['LPV_Lag2'] = table['Landing page views'].shift(2)
+    return table
+
+
+def monthly_trends(cube):
+    table = rollup(cube, MONTH_KEY, {
+        'Link clicks': 'sum',
+        'Landing page views': 'sum',
+        'Results': 'sum',
+        'Amount spent (USD)': 'sum'
+    })
+
+    # Calculate lagged values
+    table['Clicks_Lag1'] = table['Link clicks'].shift(1)
+    table['Results_Current'] = table['Results']
+    return table
+
+
+def build_report_tables(cube):
+    """Every table full_analysis.py saves, keyed like ``REPORT_FILES``."""
+    performance = program_performance(cube)
+    correlations = correlation_table(cube, max_lag=MAX_CORRELATION_LAG)
+    return {
+        'monthly_stats': monthly_stats(cube),
+        'program_click_rates': program_click_rates(cube),
+        'program_lpv_rates': program_lpv_rates(cube),
+        'program_performance': performance,
+        'program_roi': program_roi(performance),
+        'weekly_data': weekly_data(cube),
+        'monthly_trends': monthly_trends(cube),
+        'lag_correlations': correlations,
+        'leading_indicators': best_leading_indicators(correlations),
+    }
+
+
+def data_quality_summary(deduplicator, validator):
+    """Printable summary of the duplicate rows dropped and the rule violations found.
+
+    Empty when the load dropped and flagged nothing.
+    """
+    lines = []
+    if deduplicator.duplicates:
+        lines += ['', f"Duplicate rows dropped (overlapping exports): {deduplicator.duplicates} "
+                      f"({deduplicator.dropped_totals['Results_Dropped']:,.0f} results, "
+                      f"${deduplicator.dropped_totals['Spend_Dropped']:,.2f} spend)",
+                  deduplicator.dropped_report().to_string(index=False)]
+    if validator.found:
+        lines += ['', "Data-quality violations (rows kept):", validator.report().to_string(index=False)]
+    return '\n'.join(lines)
+
+
+def save_report_tables(tables, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    for name, filename in REPORT_FILES.items():
+        tables[name].to_csv(os.path.join(results_dir, filename), index=False)
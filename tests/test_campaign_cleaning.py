@@ -0,0 +1,10 @@
+from campaign_cleaning import REPORT_COLUMNS, load_campaign_data
+
+
+def test_empty_results_keep_the_clean_dtypes():
+    rows = load_campaign_data(columns=REPORT_COLUMNS, objective='Leads')
+    for empty in (load_campaign_data(columns=REPORT_COLUMNS, programs='No such program'),
+                  load_campaign_data(columns=REPORT_COLUMNS, start='2030-01-01')):
+        assert empty.empty
+        assert empty.dtypes.astype(str).to_dict() == rows.dtypes.astype(str).to_dict()
+        assert empty['Campaign name'].cat.categories.dtype == rows['Campaign name'].cat.categories.dtype
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from campaign_cleaning import load_campaign_data
+from campaign_dedup import Deduplicator, KeyCodes, superseded_positions
+
+
+def test_superseded_positions_empty():
+    positions, keys = superseded_positions(np.empty((0, 1), np.int64), np.empty(0, np.int64))
+    assert len(positions) == 0 and keys == 0
+
+
+def test_superseded_positions_keeps_last():
+    codes = np.array([[7, 1], [3, 1], [7, 1], [7, 1]], dtype=np.int64)
+    positions, keys = superseded_positions(codes, np.arange(4))
+    assert positions.tolist() == [0, 2] and keys == 1
+
+
+def test_empty_filtered_stream():
+    deduplicator = Deduplicator()
+    df = load_campaign_data(start='2030-01-01', dedupe=deduplicator)
+    assert df.empty and deduplicator.duplicates == 0
+
+
+def test_key_codes_match_across_dtypes():
+    encoder = KeyCodes(['name', 'day'])
+    first = encoder.encode(pd.DataFrame({'name': ['a', None, 'b'],
+                                         'day': pd.to_datetime(['2024-07-01', '2024-07-02', None])}))
+    second = encoder.encode(pd.DataFrame({'name': pd.Categorical(['b', 'a', None]),
+                                          'day': pd.to_datetime(['2024-07-01', '2024-07-01', '2024-07-02']).as_unit('us')}))
+    assert first.tolist() == [[0, 0], [-1, 1], [1, -1]]
+    assert second.tolist() == [[1, 0], [0, 0], [-1, 1]]
+
+
+def test_spilled_dedupe_matches_in_memory():
+    frame = pd.DataFrame({'Campaign name': list('abcabcab'), 'Reporting starts': [1, 1, 1, 1, 2, 1, 1, 2],
+                          'Reporting ends': 1, 'Objective': 'Leads', 'Results': range(8)})
+    batches = lambda columns: (frame[columns or list(frame.columns)].iloc[i:i + 3] for i in range(0, 8, 3))  # noqa: E731
+    kept = [pd.concat(Deduplicator(memory_rows=memory_rows).dedupe(batches))['Results'].tolist()
+            for memory_rows in (100, 1)]
+    assert kept[0] == kept[1] == [1, 5, 6, 7]